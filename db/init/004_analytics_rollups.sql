@@ -0,0 +1,66 @@
+-- Per-direction aggregate counts read by analytics-service instead of
+-- scanning vk_members / instagram_users / tiktok_users on every request.
+-- scraping-orchestrator applies +1/-1 deltas in the same transaction as
+-- each member upsert, so the counts always match the member tables.
+--
+-- dimension: total (value ''), gender, age, city, university and school;
+-- per-day counts are in daily_rollups. Labels use the same
+-- COALESCE/'unknown' and age buckets as the analytics endpoints.
+
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+  direction_id BIGINT NOT NULL REFERENCES directions(id) ON DELETE CASCADE,
+  platform TEXT NOT NULL,
+  dimension TEXT NOT NULL,
+  value TEXT NOT NULL,
+  count BIGINT NOT NULL,
+  PRIMARY KEY (direction_id, platform, dimension, value)
+);
+
+-- Rebuild from the member tables (safe to re-run).
+DELETE FROM analytics_rollups;
+
+INSERT INTO analytics_rollups (direction_id, platform, dimension, value, count)
+SELECT g.direction_id, 'vk', d.dimension, d.value, COUNT(*)
+FROM vk_members m
+JOIN vk_groups g ON g.id = m.vk_group_id
+CROSS JOIN LATERAL (VALUES
+  ('total', ''),
+  ('gender', COALESCE(m.gender, 'unknown')),
+  ('age', CASE
+            WHEN m.age < 18 THEN '<18'
+            WHEN m.age BETWEEN 18 AND 24 THEN '18-24'
+            WHEN m.age BETWEEN 25 AND 34 THEN '25-34'
+            WHEN m.age BETWEEN 35 AND 44 THEN '35-44'
+            WHEN m.age >= 45 THEN '45+'
+            ELSE 'unknown'
+          END),
+  ('city', COALESCE(m.city, 'unknown')),
+  ('university', COALESCE(m.university, 'unknown')),
+  ('school', COALESCE(m.school, 'unknown'))
+) AS d(dimension, value)
+WHERE d.value IS NOT NULL
+GROUP BY g.direction_id, d.dimension, d.value;
+
+INSERT INTO analytics_rollups (direction_id, platform, dimension, value, count)
+SELECT a.direction_id, 'instagram', d.dimension, d.value, COUNT(*)
+FROM instagram_users u
+JOIN instagram_accounts a ON a.id = u.instagram_account_id
+CROSS JOIN LATERAL (VALUES
+  ('total', ''),
+  ('gender', COALESCE(u.sex, 'unknown')),
+  ('city', COALESCE(u.city, 'unknown'))
+) AS d(dimension, value)
+WHERE d.value IS NOT NULL
+GROUP BY a.direction_id, d.dimension, d.value;
+
+INSERT INTO analytics_rollups (direction_id, platform, dimension, value, count)
+SELECT a.direction_id, 'tiktok', d.dimension, d.value, COUNT(*)
+FROM tiktok_users u
+JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
+CROSS JOIN LATERAL (VALUES
+  ('total', ''),
+  ('gender', COALESCE(u.sex, 'unknown')),
+  ('city', COALESCE(u.city, 'unknown'))
+) AS d(dimension, value)
+WHERE d.value IS NOT NULL
+GROUP BY a.direction_id, d.dimension, d.value;
@@ -0,0 +1,11 @@
+-- Monotonic per-direction data version. scraping-orchestrator and the
+-- platform scrapers bump it in every transaction that changes a
+-- direction's groups, accounts or members;
+-- analytics-service keys its result cache on it, so cached responses are
+-- invalidated exactly when the underlying data changes.
+
+CREATE TABLE IF NOT EXISTS direction_data_versions (
+  direction_id BIGINT PRIMARY KEY REFERENCES directions(id) ON DELETE CASCADE,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,10 @@
+-- Keyset pagination for the analytics account/user lists.
+--
+-- instagram_users / tiktok_users page on (<platform>_account_id, username)
+-- and instagram_accounts on (direction_id, username); the existing UNIQUE
+-- constraints already provide those indexes (012 adds the direction-leading
+-- ones the user lists start from). tiktok_accounts is listed
+-- most-followed first, which needs its own index.
+
+CREATE INDEX IF NOT EXISTS idx_tiktok_accounts_direction_followers
+  ON tiktok_accounts (direction_id, (COALESCE(followers_count, -1)) DESC, id DESC);
@@ -0,0 +1,18 @@
+-- Indexes behind /analytics/vk/search.
+--
+-- Queries of three or more characters use substring LIKE and word
+-- similarity (<%) on the pg_trgm GIN indexes; shorter ones use prefix LIKE
+-- on the text_pattern_ops B-tree indexes. Filters (gender, city, age) are
+-- applied on top of the direction's matches.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_vk_members_full_name_trgm
+  ON vk_members USING GIN (LOWER(full_name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vk_members_user_id_trgm
+  ON vk_members USING GIN (LOWER(vk_user_id) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_vk_members_full_name_prefix
+  ON vk_members (LOWER(full_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_vk_members_user_id_prefix
+  ON vk_members (LOWER(vk_user_id) text_pattern_ops);
@@ -0,0 +1,17 @@
+-- HyperLogLog sketches of user ids for approximate unique-user counts.
+-- scraping-orchestrator merges each import chunk into the sketch of every
+-- touched group (vk_groups.id or the platform account id) and into the
+-- direction-wide sketch stored under group_id 0. registers is the raw
+-- 2^14-byte register array (precision 14, ~0.8% standard error).
+--
+-- Data imported before this table existed is covered by
+-- POST /scrape/sketches/rebuild?direction_id=<id>.
+
+CREATE TABLE IF NOT EXISTS user_sketches (
+  direction_id BIGINT NOT NULL REFERENCES directions(id) ON DELETE CASCADE,
+  platform TEXT NOT NULL,
+  group_id BIGINT NOT NULL,
+  registers BYTEA NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (direction_id, platform, group_id)
+);
@@ -0,0 +1,20 @@
+-- Exact user-id sets for audience overlap (intersection) queries.
+-- user_ids is the ascending, de-duplicated list of 64-bit user id hashes
+-- (first 16 hex digits of md5(vk_user_id / username)) packed as 8-byte
+-- big-endian integers, so analytics-service intersects two sets with a
+-- sorted merge instead of joining the member tables. group_id is
+-- vk_groups.id or the platform account id; 0 holds the direction-wide set.
+--
+-- scraping-orchestrator rebuilds the sets of the touched groups once per
+-- import. Data imported before this table existed is covered by
+-- POST /scrape/sketches/rebuild?direction_id=<id>.
+
+CREATE TABLE IF NOT EXISTS user_id_sets (
+  direction_id BIGINT NOT NULL REFERENCES directions(id) ON DELETE CASCADE,
+  platform TEXT NOT NULL,
+  group_id BIGINT NOT NULL,
+  user_ids BYTEA NOT NULL,
+  cardinality BIGINT NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (direction_id, platform, group_id)
+);
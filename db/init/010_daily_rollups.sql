@@ -0,0 +1,39 @@
+-- Member rows per scrape day for each group (vk_groups.id or the platform
+-- account id), read by the analytics timeline endpoints so date ranges and
+-- week/month buckets never scan the member tables. scraping-orchestrator
+-- applies +1/-1 deltas next to its analytics_rollups deltas, in the same
+-- transaction as each member upsert. day is scraped_at::date. This is the
+-- only store of per-day counts; analytics_rollups has no day dimension.
+
+CREATE TABLE IF NOT EXISTS daily_rollups (
+  direction_id BIGINT NOT NULL REFERENCES directions(id) ON DELETE CASCADE,
+  platform TEXT NOT NULL,
+  day DATE NOT NULL,
+  group_id BIGINT NOT NULL,
+  count BIGINT NOT NULL,
+  PRIMARY KEY (direction_id, platform, day, group_id)
+);
+
+-- Rebuild from the member tables (safe to re-run).
+DELETE FROM daily_rollups;
+
+INSERT INTO daily_rollups (direction_id, platform, day, group_id, count)
+SELECT g.direction_id, 'vk', m.scraped_at::date, m.vk_group_id, COUNT(*)
+FROM vk_members m
+JOIN vk_groups g ON g.id = m.vk_group_id
+WHERE m.scraped_at IS NOT NULL
+GROUP BY g.direction_id, m.scraped_at::date, m.vk_group_id;
+
+INSERT INTO daily_rollups (direction_id, platform, day, group_id, count)
+SELECT a.direction_id, 'instagram', u.scraped_at::date, u.instagram_account_id, COUNT(*)
+FROM instagram_users u
+JOIN instagram_accounts a ON a.id = u.instagram_account_id
+WHERE u.scraped_at IS NOT NULL
+GROUP BY a.direction_id, u.scraped_at::date, u.instagram_account_id;
+
+INSERT INTO daily_rollups (direction_id, platform, day, group_id, count)
+SELECT a.direction_id, 'tiktok', u.scraped_at::date, u.tiktok_account_id, COUNT(*)
+FROM tiktok_users u
+JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
+WHERE u.scraped_at IS NOT NULL
+GROUP BY a.direction_id, u.scraped_at::date, u.tiktok_account_id;
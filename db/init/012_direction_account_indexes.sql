@@ -0,0 +1,14 @@
+-- Direction-leading indexes for walking a direction's groups/accounts in id
+-- order. The user lists and full-list exports page on (account id,
+-- username): they step through these ids and read each account's users
+-- from the UNIQUE (<platform>_account_id, username) index, so a page never
+-- scans past users of other directions' accounts.
+
+CREATE INDEX IF NOT EXISTS idx_vk_groups_direction_id
+  ON vk_groups (direction_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_instagram_accounts_direction_id
+  ON instagram_accounts (direction_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_tiktok_accounts_direction_id
+  ON tiktok_accounts (direction_id, id);
@@ -0,0 +1,21 @@
+-- Row samples for analytics mode=approx. A member row is in the sample when
+-- the 64-bit hash of "<group or account id>:<user id>" is below a threshold
+-- (SAMPLE_HASH in analytics-service), so each row is kept independently of
+-- its attributes and the same rows are read every time. Leading with the
+-- group/account id lets a sampled scan read only the sampled rows of the
+-- direction's groups instead of the whole member table.
+--
+-- Only Instagram and TikTok users have metrics served by a scan; every VK
+-- member metric is read from analytics_rollups.
+
+CREATE INDEX IF NOT EXISTS idx_instagram_users_sample
+  ON instagram_users (
+    instagram_account_id,
+    (('x' || substr(md5(instagram_account_id::text || ':' || username), 1, 16))::bit(64)::bigint)
+  );
+
+CREATE INDEX IF NOT EXISTS idx_tiktok_users_sample
+  ON tiktok_users (
+    tiktok_account_id,
+    (('x' || substr(md5(tiktok_account_id::text || ':' || username), 1, 16))::bit(64)::bigint)
+  );
@@ -82,3 +82,22 @@ export const apiFetch = async (path: string, options: ApiOptions = {}) => {
   }
   return response.json();
 };
+
+type BatchResult = { id: string | null; status: number; body: unknown };
+
+export const apiBatch = async (paths: string[]) => {
+  const data = (await apiFetch("/batch", {
+    method: "POST",
+    body: JSON.stringify({
+      requests: paths.map((path) => ({ id: path, method: "GET", path })),
+    }),
+  })) as { responses: BatchResult[] };
+  return data.responses.map((item) => {
+    if (item.status < 200 || item.status >= 300) {
+      const detail =
+        typeof item.body === "string" ? item.body : JSON.stringify(item.body);
+      throw new Error(detail || `HTTP ${item.status}`);
+    }
+    return item.body;
+  });
+};
@@ -53,11 +53,16 @@ import {
   AreaChart,
 } from "recharts";
 
-import { apiFetch } from "../api/client";
+import { apiBatch, apiFetch } from "../api/client";
 import { colors } from "../theme";
 
 type Direction = { id: number; name: string };
-type VkSummary = { direction_id: number; total_members: number; group_count: number };
+type VkSummary = {
+  direction_id: number;
+  total_members: number;
+  group_count: number;
+  unique_members?: number | null;
+};
 type VkGenderItem = { gender: string; count: number };
 type VkUniItem = { university: string; count: number };
 type VkSchoolItem = { school: string; count: number };
@@ -76,6 +81,16 @@ type InstagramAccountItem = { username: string; url?: string | null; name?: stri
 type InstagramUserItem = { username: string; url?: string | null; location?: string | null; sex?: string | null; city?: string | null };
 type DistributionItem = { label: string; count: number };
 type SocialSummary = { direction_id: number; accounts_count: number; users_count: number };
+type VkDashboard = {
+  summary: VkSummary;
+  gender: VkGenderItem[];
+  universities: VkUniItem[];
+  schools: VkSchoolItem[];
+  age: DistributionItem[];
+  cities: DistributionItem[];
+  timeline: VkTimelineItem[];
+};
+type SocialDashboard = { summary: SocialSummary; gender: DistributionItem[]; cities: DistributionItem[] };
 type TikTokAccountItem = {
   username: string;
   url?: string | null;
@@ -296,62 +311,46 @@ export const UserAnalyticsPage = () => {
       setError(null);
       try {
         if (activePlatform === "vk") {
-          const [
-            summaryData,
-            genderData,
-            universitiesData,
-            schoolsData,
-            timelineData,
-            groupsData,
-            vkAgeData,
-            vkCityData,
-          ] = await Promise.all([
-            apiFetch(`/analytics/vk/summary/${directionId}`),
-            apiFetch(`/analytics/vk/gender/${directionId}`),
-            apiFetch(`/analytics/vk/universities/${directionId}`),
-            apiFetch(`/analytics/vk/schools/${directionId}`),
-            apiFetch(`/analytics/vk/timeline/${directionId}`),
-            apiFetch(`/analytics/vk/groups/${directionId}`),
-            apiFetch(`/analytics/vk/age/${directionId}`),
-            apiFetch(`/analytics/vk/cities/${directionId}`),
+          const [dashboardData, groupsData] = await apiBatch([
+            `/analytics/vk/dashboard/${directionId}`,
+            `/analytics/vk/groups/${directionId}`,
           ]);
+          const dashboard = dashboardData as VkDashboard;
 
-          setSummary(summaryData as VkSummary);
-          setGender(genderData as VkGenderItem[]);
-          setUniversities(universitiesData as VkUniItem[]);
-          setSchools(schoolsData as VkSchoolItem[]);
-          setTimeline(timelineData as VkTimelineItem[]);
+          setSummary(dashboard.summary);
+          setGender(dashboard.gender);
+          setUniversities(dashboard.universities);
+          setSchools(dashboard.schools);
+          setTimeline(dashboard.timeline);
           setGroups((groupsData as { items: VkGroupItem[] }).items ?? []);
-          setVkAgeDistribution(vkAgeData as DistributionItem[]);
-          setVkCityDistribution(vkCityData as DistributionItem[]);
+          setVkAgeDistribution(dashboard.age);
+          setVkCityDistribution(dashboard.cities);
         } else if (activePlatform === "instagram") {
-          const [summaryData, accountsData, usersData, genderData, citiesData] = await Promise.all([
-            apiFetch(`/analytics/instagram/summary/${directionId}`),
-            apiFetch(`/analytics/instagram/accounts/${directionId}`),
-            apiFetch(`/analytics/instagram/users/${directionId}`),
-            apiFetch(`/analytics/instagram/gender/${directionId}`),
-            apiFetch(`/analytics/instagram/cities/${directionId}`),
+          const [dashboardData, accountsData, usersData] = await apiBatch([
+            `/analytics/instagram/dashboard/${directionId}`,
+            `/analytics/instagram/accounts/${directionId}`,
+            `/analytics/instagram/users/${directionId}`,
           ]);
+          const dashboard = dashboardData as SocialDashboard;
 
-          setInstagramSummary(summaryData as SocialSummary);
+          setInstagramSummary(dashboard.summary);
           setInstagramAccounts((accountsData as { items: InstagramAccountItem[] }).items ?? []);
           setInstagramUsers((usersData as { items: InstagramUserItem[] }).items ?? []);
-          setSocialGender(genderData as DistributionItem[]);
-          setSocialCities(citiesData as DistributionItem[]);
+          setSocialGender(dashboard.gender);
+          setSocialCities(dashboard.cities);
         } else if (activePlatform === "tiktok") {
-          const [summaryData, accountsData, usersData, genderData, citiesData] = await Promise.all([
-            apiFetch(`/analytics/tiktok/summary/${directionId}`),
-            apiFetch(`/analytics/tiktok/accounts/${directionId}`),
-            apiFetch(`/analytics/tiktok/users/${directionId}`),
-            apiFetch(`/analytics/tiktok/gender/${directionId}`),
-            apiFetch(`/analytics/tiktok/cities/${directionId}`),
+          const [dashboardData, accountsData, usersData] = await apiBatch([
+            `/analytics/tiktok/dashboard/${directionId}`,
+            `/analytics/tiktok/accounts/${directionId}`,
+            `/analytics/tiktok/users/${directionId}`,
           ]);
+          const dashboard = dashboardData as SocialDashboard;
 
-          setTiktokSummary(summaryData as SocialSummary);
+          setTiktokSummary(dashboard.summary);
           setTiktokAccounts((accountsData as { items: TikTokAccountItem[] }).items ?? []);
           setTiktokUsers((usersData as { items: TikTokUserItem[] }).items ?? []);
-          setSocialGender(genderData as DistributionItem[]);
-          setSocialCities(citiesData as DistributionItem[]);
+          setSocialGender(dashboard.gender);
+          setSocialCities(dashboard.cities);
         }
       } catch (err) {
         setError((err as Error).message);
@@ -472,6 +471,11 @@ export const UserAnalyticsPage = () => {
               <StatCard
                 title="Всего подписчиков"
                 value={summary?.total_members?.toLocaleString() ?? "—"}
+                subtitle={
+                  summary?.unique_members != null
+                    ? `≈ ${summary.unique_members.toLocaleString()} уникальных`
+                    : undefined
+                }
                 icon={<Users size={24} color="#fff" />}
                 gradient={`linear-gradient(135deg, ${colors.primary.main} 0%, ${colors.primary.dark} 100%)`}
                 loading={loadingData}
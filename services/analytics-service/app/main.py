@@ -1,13 +1,223 @@
+import asyncio
+import base64
+import csv
+import functools
+import io
+import json
+import math
 import os
-from typing import Dict, List, Optional
-
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, status
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+)
+
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _async_database_url(url: str) -> str:
+    # Compose and the other services share a plain postgresql:// URL.
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+engine = create_async_engine(
+    _async_database_url(DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "2000"))
+# Queries shorter than a trigram cannot use the pg_trgm indexes, so they
+# fall back to prefix matching on the text_pattern_ops indexes.
+SEARCH_MIN_TRIGRAM_LENGTH = 3
+
+# user_sketches are written by scraping-orchestrator with precision 14.
+HLL_PRECISION = 14
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(1 << HLL_PRECISION)
+DIRECTION_SKETCH = 0
+_HLL_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+# An overlap matrix is sets x sets intersections; bound it per request.
+OVERLAP_MAX_SETS = int(os.getenv("OVERLAP_MAX_SETS", "50"))
+CUBE_MAX_BYTES = int(os.getenv("CUBE_MAX_BYTES", str(256 * 1024 * 1024)))
+CUBE_LOAD_CHUNK = 50_000
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+# mode=approx samples about this many member rows of the direction for
+# metrics that are not rolled up; rolled-up metrics are always exact.
+APPROX_SAMPLE_ROWS = int(os.getenv("APPROX_SAMPLE_ROWS", "200000"))
+APPROX_CONFIDENCE = 0.95
+APPROX_Z = 1.96
+MODE_PATTERN = "^(exact|approx)$"
+GRANULARITY_PATTERN = "^(day|week|month)$"
+
+AGE_BUCKET_SQL = """
+    CASE
+        WHEN m.age < 18 THEN '<18'
+        WHEN m.age BETWEEN 18 AND 24 THEN '18-24'
+        WHEN m.age BETWEEN 25 AND 34 THEN '25-34'
+        WHEN m.age BETWEEN 35 AND 44 THEN '35-44'
+        WHEN m.age >= 45 THEN '45+'
+        ELSE 'unknown'
+    END
+"""
+
+
+# Uniform 64-bit hash of a member row's key. mode=approx keeps the rows
+# hashing below a threshold: each row is in the sample independently of
+# its attributes, and the same rows are picked on every read. The
+# expression must match the indexes in db/init/013_member_sample_indexes.sql.
+SAMPLE_HASH = "('x' || substr(md5({key}), 1, 16))::bit(64)::bigint"
+
+
+class FactTable(NamedTuple):
+    """A member table, aliased ``m``, joined to the column naming its direction.
+
+    ``sample_key`` identifies a member row (group and user) for SAMPLE_HASH.
+    """
+
+    table: str
+    join: str
+    direction_column: str
+    sample_key: str
+
+    def source(self) -> str:
+        return f"{self.table} m {self.join}"
+
+    def sample_filter(self) -> str:
+        return f"AND {SAMPLE_HASH.format(key=self.sample_key)} < :sample_threshold"
+
+
+class Metric(NamedTuple):
+    """A count of member rows per label of ``expression``.
+
+    Results are ordered by count and cut to ``top_n``. Counts per scrape day
+    are not metrics: they live in daily_rollups (see ``_timeline``).
+    """
+
+    fact: FactTable
+    expression: str
+    top_n: Optional[int] = None
+
+
+VK_MEMBERS = FactTable(
+    "vk_members",
+    "JOIN vk_groups g ON g.id = m.vk_group_id",
+    "g.direction_id",
+    "m.vk_group_id::text || ':' || m.vk_user_id",
+)
+INSTAGRAM_USERS = FactTable(
+    "instagram_users",
+    "JOIN instagram_accounts g ON g.id = m.instagram_account_id",
+    "g.direction_id",
+    "m.instagram_account_id::text || ':' || m.username",
+)
+TIKTOK_USERS = FactTable(
+    "tiktok_users",
+    "JOIN tiktok_accounts g ON g.id = m.tiktok_account_id",
+    "g.direction_id",
+    "m.tiktok_account_id::text || ':' || m.username",
+)
+
+
+def _social_metrics(fact: FactTable) -> Dict[str, Metric]:
+    return {
+        "total": Metric(fact, "''"),
+        "gender": Metric(fact, "COALESCE(m.sex, 'unknown')"),
+        "city": Metric(fact, "COALESCE(m.city, 'unknown')", top_n=20),
+        "location": Metric(fact, "COALESCE(NULLIF(m.location, ''), 'unknown')", top_n=20),
+    }
+
+
+# Labels match the analytics_rollups ones, so a metric reads the same
+# whether it is served from the rollup table or from a scan.
+METRICS: Dict[str, Dict[str, Metric]] = {
+    "vk": {
+        "total": Metric(VK_MEMBERS, "''"),
+        "gender": Metric(VK_MEMBERS, "COALESCE(m.gender, 'unknown')"),
+        "age": Metric(VK_MEMBERS, AGE_BUCKET_SQL),
+        "city": Metric(VK_MEMBERS, "COALESCE(m.city, 'unknown')", top_n=20),
+        "university": Metric(VK_MEMBERS, "COALESCE(m.university, 'unknown')", top_n=50),
+        "school": Metric(VK_MEMBERS, "COALESCE(m.school, 'unknown')", top_n=50),
+    },
+    "instagram": _social_metrics(INSTAGRAM_USERS),
+    "tiktok": _social_metrics(TIKTOK_USERS),
+}
+
+# Metrics scraping-orchestrator maintains in analytics_rollups
+# (VK_ROLLUP_DIMENSIONS / SOCIAL_ROLLUP_DIMENSIONS there). Any other
+# metric is computed from its fact table.
+ROLLUP_DIMENSIONS = {
+    "vk": {"total", "gender", "age", "city", "university", "school"},
+    "instagram": {"total", "gender", "city"},
+    "tiktok": {"total", "gender", "city"},
+}
+
+CUBE_DIMENSIONS = {
+    "vk": ("gender", "city", "university", "school", "age"),
+    "instagram": ("gender", "city"),
+    "tiktok": ("gender", "city"),
+}
+
+# platform -> (field names, query) of the full-list exports, in the same
+# order as the keyset-paginated list endpoints. Ordering by the group or
+# account id lets the scan start from the direction's ids
+# (db/init/012_direction_account_indexes.sql).
+EXPORT_SOURCES = {
+    "vk": (
+        ("group", "vk_user_id", "full_name", "gender", "age", "city", "university", "school"),
+        """
+        SELECT g.name, m.vk_user_id, m.full_name, m.gender, m.age, m.city, m.university, m.school
+        FROM vk_members m
+        JOIN vk_groups g ON g.id = m.vk_group_id
+        WHERE g.direction_id = :direction_id
+        ORDER BY g.id, m.vk_user_id
+        """,
+    ),
+    "instagram": (
+        ("account", "username", "url", "location", "sex", "city"),
+        """
+        SELECT a.username, u.username, u.url, u.location, u.sex, u.city
+        FROM instagram_users u
+        JOIN instagram_accounts a ON a.id = u.instagram_account_id
+        WHERE a.direction_id = :direction_id
+        ORDER BY a.id, u.username
+        """,
+    ),
+    "tiktok": (
+        ("account", "username", "url", "location", "followers_count", "sex", "city"),
+        """
+        SELECT a.username, u.username, u.url, u.location, u.followers_count, u.sex, u.city
+        FROM tiktok_users u
+        JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
+        WHERE a.direction_id = :direction_id
+        ORDER BY a.id, u.username
+        """,
+    ),
+}
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
 
 ALL_ROLES = {"user", "admin", "developer"}
 
@@ -16,6 +226,7 @@ class VkSummaryResponse(BaseModel):
     direction_id: int
     total_members: int
     group_count: int
+    unique_members: Optional[int] = None
 
 
 class VkGenderItem(BaseModel):
@@ -38,6 +249,12 @@ class VkTimelineItem(BaseModel):
     count: int
 
 
+class TimelineItem(BaseModel):
+    # First day of the bucket (weeks start on Monday), YYYY-MM-DD.
+    day: str
+    count: int
+
+
 class VkMemberItem(BaseModel):
     vk_user_id: str
     full_name: Optional[str]
@@ -46,11 +263,16 @@ class VkMemberItem(BaseModel):
     city: Optional[str]
     university: Optional[str]
     school: Optional[str]
+    score: Optional[float] = None
 
 
 class DistributionItem(BaseModel):
     label: str
     count: int
+    # Bounds of the confidence interval, only on mode=approx estimates from
+    # /{platform}/metrics.
+    ci_low: Optional[int] = None
+    ci_high: Optional[int] = None
 
 
 class VkMemberSearchResponse(BaseModel):
@@ -74,10 +296,12 @@ class InstagramUserItem(BaseModel):
 
 class InstagramAccountsResponse(BaseModel):
     items: List[InstagramAccountItem]
+    next_cursor: Optional[str] = None
 
 
 class InstagramUsersResponse(BaseModel):
     items: List[InstagramUserItem]
+    next_cursor: Optional[str] = None
 
 
 class TikTokAccountItem(BaseModel):
@@ -99,10 +323,12 @@ class TikTokUserItem(BaseModel):
 
 class TikTokAccountsResponse(BaseModel):
     items: List[TikTokAccountItem]
+    next_cursor: Optional[str] = None
 
 
 class TikTokUsersResponse(BaseModel):
     items: List[TikTokUserItem]
+    next_cursor: Optional[str] = None
 
 
 class DirectionGroupsItem(BaseModel):
@@ -121,6 +347,403 @@ class SocialSummaryResponse(BaseModel):
     users_count: int
 
 
+class UniqueUsersResponse(BaseModel):
+    platform: str
+    direction_ids: List[int]
+    group_ids: Optional[List[int]] = None
+    unique_users: Optional[int]
+    relative_error: float
+
+
+class OverlapSet(BaseModel):
+    id: int
+    name: Optional[str]
+    unique_users: int
+
+
+class OverlapResponse(BaseModel):
+    platform: str
+    sets: List[OverlapSet]
+    # matrix[i][j] = users in both sets[i] and sets[j]; the diagonal is each set's size.
+    matrix: List[List[int]]
+
+
+class SampleInfo(BaseModel):
+    rows: int
+    population: int
+    percent: float
+    confidence: float
+    # Largest half-width of a label's interval, as a share of the population.
+    margin: float
+
+
+class MetricsResponse(BaseModel):
+    platform: str
+    direction_id: int
+    metrics: Dict[str, List[DistributionItem]]
+    sample: Optional[SampleInfo] = None
+
+
+class CubeRow(BaseModel):
+    values: List[str]
+    count: int
+
+
+class CubeResponse(BaseModel):
+    platform: str
+    direction_id: int
+    group_by: List[str]
+    # Members matching the filters; rows may be cut off by ``limit``.
+    total: int
+    rows: List[CubeRow]
+
+
+class VkDashboardResponse(BaseModel):
+    summary: VkSummaryResponse
+    gender: List[VkGenderItem]
+    universities: List[VkUniItem]
+    schools: List[VkSchoolItem]
+    age: List[DistributionItem]
+    cities: List[DistributionItem]
+    timeline: List[VkTimelineItem]
+
+
+class SocialDashboardResponse(BaseModel):
+    summary: SocialSummaryResponse
+    gender: List[DistributionItem]
+    cities: List[DistributionItem]
+
+
+class ResultCache:
+    """LRU of serialized JSON responses, bounded by total body bytes.
+
+    Keys carry the direction's data version, so an import makes every older
+    entry for that direction unreachable; the TTL only bounds how long such
+    orphans and rarely used entries hold memory.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, body = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            del self._entries[key]
+            self.size_bytes -= len(body)
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if len(body) > self.max_bytes or self.ttl <= 0:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= len(old[1])
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self.size_bytes += len(body)
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+RESULT_CACHE = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+
+async def _data_version(direction_id: int) -> int:
+    async with engine.connect() as conn:
+        row = (await conn.execute(
+            text("SELECT version FROM direction_data_versions WHERE direction_id = :did"),
+            {"did": direction_id},
+        )).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _records(model: type, rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """DB rows as plain dicts keyed by ``model``'s fields, in declaration order.
+
+    List and distribution endpoints return these and let ``cached`` encode
+    them with orjson, instead of building and re-validating a pydantic model
+    per row. Columns past the model's fields (keyset tie-breakers) are
+    dropped, so SELECTs list the response fields first.
+    """
+    fields = tuple(model.model_fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def cached(endpoint: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Response]]:
+    """Serve an endpoint's JSON from RESULT_CACHE, keyed on its arguments.
+
+    Every wrapped endpoint takes ``direction_id``; its data version is part
+    of the key. A hit returns the stored bytes without running the
+    endpoint's SQL or serialization. The endpoint's ``response_model`` only
+    documents the shape: results are encoded with orjson as returned.
+    """
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs: Any) -> Response:
+        args = tuple(
+            sorted(
+                (k, tuple(v) if isinstance(v, list) else v)
+                for k, v in kwargs.items()
+                if k != "_"
+            )
+        )
+        key = (endpoint.__name__, await _data_version(kwargs["direction_id"]), args)
+        body = RESULT_CACHE.get(key)
+        if body is None:
+            result = await endpoint(**kwargs)
+            if isinstance(result, Response):
+                # Sampled (mode=approx) answers bypass the cache.
+                return result
+            body = orjson.dumps(result, default=_json_default)
+            RESULT_CACHE.put(key, body)
+        return Response(body, media_type="application/json")
+
+    return wrapper
+
+
+class DirectionCube:
+    """Dictionary-encoded member columns of one direction.
+
+    ``codes[dimension][i]`` indexes ``labels[dimension]`` for member row i,
+    so filters and group-bys are integer array operations.
+    """
+
+    def __init__(self, labels: Dict[str, List[str]], codes: Dict[str, np.ndarray]) -> None:
+        self.labels = labels
+        self.codes = codes
+        self.rows = len(next(iter(codes.values()))) if codes else 0
+        self._index = {dim: {label: i for i, label in enumerate(values)} for dim, values in labels.items()}
+        self.nbytes = sum(c.nbytes for c in codes.values()) + sum(
+            len(label) for values in labels.values() for label in values
+        )
+
+    def mask(self, filters: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        """Rows matching every dimension filter (values within one are ORed)."""
+        mask = None
+        for dim, values in filters.items():
+            wanted = [self._index[dim][v] for v in values if v in self._index[dim]]
+            matches = np.isin(self.codes[dim], wanted)
+            mask = matches if mask is None else mask & matches
+        return mask
+
+    def group_by(self, dims: List[str], filters: Dict[str, List[str]]) -> Tuple[int, List[Tuple[List[str], int]]]:
+        """Total matching rows and ``(labels, count)`` per combination of ``dims``."""
+        mask = self.mask(filters)
+        total = self.rows if mask is None else int(np.count_nonzero(mask))
+        if not dims:
+            return total, [([], total)]
+        shape = tuple(len(self.labels[dim]) for dim in dims)
+        key = np.zeros(total, dtype=np.int64)
+        for dim, size in zip(dims, shape):
+            codes = self.codes[dim] if mask is None else self.codes[dim][mask]
+            key = key * size + codes
+        cells = math.prod(shape)
+        if cells <= max(total, 1 << 16):
+            counts = np.bincount(key, minlength=cells)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            keys, counts = np.unique(key, return_counts=True)
+        order = np.lexsort((keys, -counts))
+        positions = np.unravel_index(keys[order], shape)
+        groups = [
+            ([self.labels[dim][i] for dim, i in zip(dims, combo)], int(count))
+            for combo, count in zip(zip(*(p.tolist() for p in positions)), counts[order].tolist())
+        ]
+        return total, groups
+
+
+def _encode_cube_rows(
+    rows: List[tuple],
+    columns: List[array],
+    index: List[Dict[str, int]],
+    labels: List[List[str]],
+) -> None:
+    """Append each row's dictionary codes to ``columns``, growing the dictionaries."""
+    for row in rows:
+        for value, column, dim_index, dim_labels in zip(row, columns, index, labels):
+            code = dim_index.get(value)
+            if code is None:
+                code = dim_index[value] = len(dim_labels)
+                dim_labels.append(value)
+            column.append(code)
+
+
+async def _load_cube(platform: str, direction_id: int) -> DirectionCube:
+    dims = CUBE_DIMENSIONS[platform]
+    metrics = [METRICS[platform][dim] for dim in dims]
+    query = f"""
+        SELECT {', '.join(metric.expression for metric in metrics)}
+        FROM {metrics[0].fact.source()}
+        WHERE {metrics[0].fact.direction_column} = :did
+    """
+    labels: Dict[str, List[str]] = {dim: [] for dim in dims}
+    index: Dict[str, Dict[str, int]] = {dim: {} for dim in dims}
+    columns = [array("I") for _ in dims]
+    async with engine.connect() as conn:
+        result = await conn.stream(text(query), {"did": direction_id})
+        async for rows in result.partitions(CUBE_LOAD_CHUNK):
+            # The per-row loop is CPU-bound; keep it off the event loop.
+            await asyncio.to_thread(
+                _encode_cube_rows, rows, columns, list(index.values()), list(labels.values())
+            )
+    codes = {}
+    for dim, column in zip(dims, columns):
+        dtype = np.min_scalar_type(max(len(labels[dim]) - 1, 0))
+        codes[dim] = np.frombuffer(column, dtype=np.uint32).astype(dtype)
+    return DirectionCube(labels, codes)
+
+
+class CubeCache:
+    """LRU of DirectionCube snapshots, bounded by their total size.
+
+    A snapshot is tagged with the data version it was built at and is
+    rebuilt on the first request after an import moves the version on.
+    Directions whose build would not fit ``max_bytes`` are not built:
+    ``get`` returns None and the caller answers from SQL instead.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+        self.oversized = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[int, DirectionCube]]" = OrderedDict()
+        self._builds: Dict[Tuple[str, int, int], "asyncio.Task[DirectionCube]"] = {}
+
+    def _fresh(self, key: Tuple[str, int], version: int) -> Optional[DirectionCube]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def get(self, platform: str, direction_id: int) -> Optional[DirectionCube]:
+        key = (platform, direction_id)
+        version = await _data_version(direction_id)
+        cube = self._fresh(key, version)
+        if cube is not None:
+            return cube
+        build_key = (platform, direction_id, version)
+        if build_key not in self._builds:
+            async with engine.connect() as conn:
+                rows = _metric_total(await _metrics(conn, platform, direction_id, ["total"]))
+            # Loading holds a 4-byte code per row and dimension.
+            if rows * len(CUBE_DIMENSIONS[platform]) * 4 > self.max_bytes:
+                self.oversized += 1
+                return None
+        # One build per direction and version; concurrent requests await the
+        # same task, which stays registered until its cube is stored or its
+        # error has reached every waiter.
+        build = self._builds.get(build_key)
+        if build is None:
+            build = asyncio.ensure_future(self._build(key, version))
+            self._builds[build_key] = build
+            build.add_done_callback(lambda task: self._done(build_key, task))
+        return await asyncio.shield(build)
+
+    async def _build(self, key: Tuple[str, int], version: int) -> DirectionCube:
+        cube = await _load_cube(*key)
+        self.builds += 1
+        self._put(key, version, cube)
+        return cube
+
+    def _done(self, build_key: Tuple[str, int, int], task: "asyncio.Task[DirectionCube]") -> None:
+        if self._builds.get(build_key) is task:
+            del self._builds[build_key]
+        if not task.cancelled():
+            task.exception()
+
+    def _put(self, key: Tuple[str, int], version: int, cube: DirectionCube) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= old[1].nbytes
+        if cube.nbytes > self.max_bytes:
+            return
+        self._entries[key] = (version, cube)
+        self.size_bytes += cube.nbytes
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "builds": self.builds,
+            "building": len(self._builds),
+            "evictions": self.evictions,
+            "oversized": self.oversized,
+        }
+
+
+async def _scan_cube(
+    platform: str, direction_id: int, group_by: List[str], filters: Dict[str, List[str]]
+) -> Tuple[int, List[Tuple[List[str], int]]]:
+    """DirectionCube.group_by computed in SQL, for directions too large to cache."""
+    registry = METRICS[platform]
+    fact = registry[CUBE_DIMENSIONS[platform][0]].fact
+    params: Dict[str, Any] = {"did": direction_id}
+    conditions = []
+    for i, (dim, values) in enumerate(filters.items()):
+        conditions.append(f"AND {registry[dim].expression} = ANY(:filter_{i})")
+        params[f"filter_{i}"] = values
+    columns = [registry[dim].expression for dim in group_by]
+    group = f"GROUP BY {', '.join(str(i) for i in range(1, len(columns) + 1))}" if columns else ""
+    query = f"""
+        SELECT {', '.join([*columns, 'COUNT(*)'])}
+        FROM {fact.source()}
+        WHERE {fact.direction_column} = :did
+          {" ".join(conditions)}
+        {group}
+    """
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text(query), params)).fetchall()
+    groups = sorted(((list(row[:-1]), int(row[-1])) for row in rows), key=lambda g: (-g[1], g[0]))
+    return sum(count for _, count in groups), groups
+
+
+CUBE_CACHE = CubeCache(CUBE_MAX_BYTES)
+
+
 app = FastAPI(title="TASPA Analytics Service")
 app.router.redirect_slashes = False
 router = APIRouter(prefix="/analytics")
@@ -146,10 +769,334 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@router.get("/cache/stats")
+async def cache_stats(_: List[str] = Depends(require_any_role)) -> dict:
+    return {"result_cache": RESULT_CACHE.stats(), "cube_cache": CUBE_CACHE.stats()}
+
+
+async def _rollups(
+    conn, platform: str, direction_id: int, dimensions: Optional[List[str]] = None
+) -> Dict[str, List[tuple]]:
+    """Read ``(value, count)`` pairs from analytics_rollups, keyed by dimension.
+
+    Pairs within a dimension are ordered by count, highest first. The
+    ``total`` dimension holds a single pair with value ``''``.
+    """
+    query = """
+        SELECT dimension, value, count
+        FROM analytics_rollups
+        WHERE direction_id = :direction_id AND platform = :platform
+    """
+    params = {"direction_id": direction_id, "platform": platform}
+    if dimensions is not None:
+        query += " AND dimension = ANY(:dimensions)"
+        params["dimensions"] = dimensions
+    return _group_counts(await conn.execute(text(query), params))
+
+
+def _group_counts(rows: Iterable[tuple]) -> Dict[str, List[tuple]]:
+    """Group ``(key, value, count)`` rows by key, highest count first."""
+    result: Dict[str, List[tuple]] = {}
+    for key, value, count in rows:
+        result.setdefault(key, []).append((value, int(count)))
+    for pairs in result.values():
+        pairs.sort(key=lambda pair: (-pair[1], pair[0]))
+    return result
+
+
+async def _scan_metrics(
+    conn,
+    fact: FactTable,
+    direction_id: int,
+    metrics: Dict[str, Metric],
+    sample_threshold: Optional[int] = None,
+) -> Dict[str, List[tuple]]:
+    """Compute several metrics of one fact table in a single scan.
+
+    With ``sample_threshold`` only the rows whose SAMPLE_HASH is below it
+    are counted, read through the sample indexes.
+    """
+    labels = ",\n".join(f"('{name}', {metric.expression})" for name, metric in metrics.items())
+    sample = fact.sample_filter() if sample_threshold is not None else ""
+    query = f"""
+        SELECT d.metric, d.value, COUNT(*)
+        FROM {fact.source()}
+        CROSS JOIN LATERAL (VALUES {labels}) AS d(metric, value)
+        WHERE {fact.direction_column} = :direction_id AND d.value IS NOT NULL
+          {sample}
+        GROUP BY d.metric, d.value
+    """
+    params: Dict[str, Any] = {"direction_id": direction_id}
+    if sample_threshold is not None:
+        params["sample_threshold"] = sample_threshold
+    return _group_counts(await conn.execute(text(query), params))
+
+
+def _shape(metric: Metric, pairs: List[tuple]) -> List[tuple]:
+    return pairs[:metric.top_n]
+
+
+async def _metrics(
+    conn, platform: str, direction_id: int, names: List[str]
+) -> Dict[str, List[tuple]]:
+    """``(label, count)`` pairs of each named METRICS entry, ordered and cut to top-N.
+
+    Rolled-up metrics share one analytics_rollups read; the rest share one
+    scan per fact table.
+    """
+    registry = METRICS[platform]
+    rolled = [name for name in names if name in ROLLUP_DIMENSIONS[platform]]
+    result = await _rollups(conn, platform, direction_id, rolled) if rolled else {}
+    scans: Dict[FactTable, Dict[str, Metric]] = {}
+    for name in names:
+        if name not in ROLLUP_DIMENSIONS[platform]:
+            scans.setdefault(registry[name].fact, {})[name] = registry[name]
+    for fact, metrics in scans.items():
+        result.update(await _scan_metrics(conn, fact, direction_id, metrics))
+    return {name: _shape(registry[name], result.get(name, [])) for name in names}
+
+
+def _estimate(count: int, rows: int, population: int) -> Tuple[int, int, int]:
+    """Scale a sample count to the direction, with a normal-approximation interval.
+
+    Rows enter the sample independently (see SAMPLE_HASH), so the binomial
+    interval applies; it includes the finite population correction.
+    """
+    share = count / rows
+    correction = max(0.0, 1 - rows / population)
+    half = APPROX_Z * population * math.sqrt(share * (1 - share) / rows * correction)
+    estimate = share * population
+    return (
+        round(estimate),
+        max(0, math.floor(estimate - half)),
+        min(population, math.ceil(estimate + half)),
+    )
+
+
+async def _sampled_metrics(
+    conn, platform: str, direction_id: int, names: List[str]
+) -> Tuple[Dict[str, List[tuple]], Optional[SampleInfo]]:
+    """Exact rolled-up metrics plus estimates of the others from a row sample.
+
+    Rolled-up metrics are cheaper to read exactly than to sample, so only
+    the scan-path ones are estimated, from the direction's rows hashing
+    below a threshold chosen to keep about APPROX_SAMPLE_ROWS of them.
+    Estimated pairs are ``(label, estimate, ci_low, ci_high)``. Without a
+    scan-path metric, or for a direction small enough to read whole, the
+    answer is exact and comes without a SampleInfo.
+    """
+    rolled = [name for name in names if name in ROLLUP_DIMENSIONS[platform]]
+    scanned = [name for name in names if name not in ROLLUP_DIMENSIONS[platform]]
+    if not scanned:
+        return await _metrics(conn, platform, direction_id, names), None
+    exact = await _metrics(conn, platform, direction_id, list(dict.fromkeys(["total", *rolled])))
+    population = _metric_total(exact)
+    fraction = APPROX_SAMPLE_ROWS / population if population else 1.0
+    if fraction >= 1:
+        return await _metrics(conn, platform, direction_id, names), None
+    # Every metric of a platform reads the same fact table.
+    registry = METRICS[platform]
+    counts = await _scan_metrics(
+        conn,
+        registry["total"].fact,
+        direction_id,
+        {name: registry[name] for name in ["total", *scanned]},
+        sample_threshold=-(1 << 63) + int(fraction * (1 << 64)),
+    )
+    rows = _metric_total(counts)
+    result = {name: exact[name] for name in rolled}
+    for name in scanned:
+        result[name] = [
+            (label, *_estimate(count, rows, population))
+            for label, count in _shape(registry[name], counts.get(name, []))
+        ] if rows else []
+    margin = APPROX_Z * math.sqrt(0.25 / rows * max(0.0, 1 - rows / population)) if rows else 1.0
+    sample = SampleInfo(
+        rows=rows,
+        population=population,
+        percent=round(100 * fraction, 4),
+        confidence=APPROX_CONFIDENCE,
+        margin=round(margin, 4),
+    )
+    return {name: result[name] for name in names}, sample
+
+
+async def _timeline(
+    conn,
+    platform: str,
+    direction_id: int,
+    start: Optional[date],
+    end: Optional[date],
+    granularity: str,
+    group_ids: Optional[List[int]],
+) -> List[tuple]:
+    """``(bucket start, count)`` pairs from daily_rollups, oldest first.
+
+    ``start`` and ``end`` are inclusive scrape days; ``group_ids`` limits the
+    counts to those groups/accounts.
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'"
+        )
+    filters = []
+    params: Dict[str, Any] = {
+        "direction_id": direction_id,
+        "platform": platform,
+        "granularity": granularity,
+    }
+    if start is not None:
+        filters.append("AND day >= :start")
+        params["start"] = start
+    if end is not None:
+        filters.append("AND day <= :end")
+        params["end"] = end
+    if group_ids:
+        filters.append("AND group_id = ANY(:group_ids)")
+        params["group_ids"] = group_ids
+    rows = (await conn.execute(
+        text(
+            f"""
+            SELECT to_char(date_trunc(:granularity, day::timestamp), 'YYYY-MM-DD') AS bucket, SUM(count)
+            FROM daily_rollups
+            WHERE direction_id = :direction_id AND platform = :platform
+              {" ".join(filters)}
+            GROUP BY bucket
+            ORDER BY bucket
+            """
+        ),
+        params,
+    )).fetchall()
+    return [(row[0], int(row[1])) for row in rows]
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _encode_cursor(key: list) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, types: Tuple[type, ...]) -> list:
+    """Decode an opaque cursor back into the sort key of the last row served."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(key, types))
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return key
+
+
+def _page(rows: list, limit: int, key: Callable[[Any], list]) -> Tuple[list, Optional[str]]:
+    """Trim the extra look-ahead row and build the cursor for the next page."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor(key(rows[-1]))
+
+
+async def _metric(platform: str, direction_id: int, name: str) -> List[tuple]:
+    async with engine.connect() as conn:
+        return (await _metrics(conn, platform, direction_id, [name]))[name]
+
+
+def _metric_total(metrics: Dict[str, List[tuple]]) -> int:
+    return (metrics.get("total") or [("", 0)])[0][1]
+
+
+def _hll_union(sketches: Iterable[bytes]) -> Optional[bytes]:
+    merged: Optional[bytes] = None
+    for registers in sketches:
+        merged = registers if merged is None else bytes(map(max, merged, registers))
+    return merged
+
+
+def _hll_estimate(registers: bytes) -> int:
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(map(_HLL_INVERSE_POWERS.__getitem__, registers))
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting).
+        estimate = m * math.log(m / zeros)
+    return round(estimate)
+
+
+async def _unique_users(
+    conn, platform: str, direction_ids: List[int], group_ids: Optional[List[int]] = None
+) -> Optional[int]:
+    """Estimated distinct users across the given directions or groups.
+
+    Returns None when no sketch exists yet, e.g. for data imported before
+    sketches were introduced and not rebuilt since.
+    """
+    params: Dict[str, Any] = {"platform": platform, "direction_ids": direction_ids}
+    if group_ids:
+        scope = "group_id = ANY(:group_ids)"
+        params["group_ids"] = group_ids
+    else:
+        scope = "group_id = :direction_sketch"
+        params["direction_sketch"] = DIRECTION_SKETCH
+    rows = (await conn.execute(
+        text(
+            f"""
+            SELECT registers FROM user_sketches
+            WHERE platform = :platform AND direction_id = ANY(:direction_ids) AND {scope}
+            """
+        ),
+        params,
+    )).fetchall()
+    merged = _hll_union(bytes(row[0]) for row in rows)
+    return _hll_estimate(merged) if merged is not None else None
+
+
+def _intersection_size(a: np.ndarray, b: np.ndarray) -> int:
+    """Size of the intersection of two sorted, de-duplicated id arrays."""
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return 0
+    positions = np.searchsorted(b, a)
+    positions[positions == len(b)] = 0
+    return int(np.count_nonzero(b[positions] == a))
+
+
+def _overlap_matrix(sets: List[np.ndarray]) -> List[List[int]]:
+    matrix = [[0] * len(sets) for _ in sets]
+    for i, a in enumerate(sets):
+        matrix[i][i] = len(a)
+        for j in range(i + 1, len(sets)):
+            matrix[i][j] = matrix[j][i] = _intersection_size(a, sets[j])
+    return matrix
+
+
+def _overlap_response(platform: str, rows: List[tuple]) -> OverlapResponse:
+    """Build the overlap matrix of ``(id, name, user_ids)`` rows.
+
+    CPU-bound over large arrays: endpoints run it with asyncio.to_thread.
+    """
+    # user_id_sets.user_ids is packed by the orchestrator as big-endian int8;
+    # convert each set to native order once instead of on every comparison.
+    sets = [np.frombuffer(bytes(row[2]), dtype=">i8").astype(np.int64) for row in rows]
+    return OverlapResponse(
+        platform=platform,
+        sets=[OverlapSet(id=row[0], name=row[1], unique_users=len(ids)) for row, ids in zip(rows, sets)],
+        matrix=_overlap_matrix(sets),
+    )
+
+
 @router.get("/vk/summary/{direction_id}", response_model=VkSummaryResponse)
-def vk_summary(direction_id: int, _: List[str] = Depends(require_any_role)) -> VkSummaryResponse:
-    with engine.connect() as conn:
-        group_row = conn.execute(
+@cached
+async def vk_summary(direction_id: int, _: List[str] = Depends(require_any_role)) -> VkSummaryResponse:
+    async with engine.connect() as conn:
+        group_row = (await conn.execute(
             text(
                 """
                 SELECT COUNT(*) AS group_count
@@ -158,204 +1105,251 @@ def vk_summary(direction_id: int, _: List[str] = Depends(require_any_role)) -> V
                 """
             ),
             {"direction_id": direction_id},
-        ).fetchone()
-        members_row = conn.execute(
-            text(
-                """
-                SELECT COUNT(*) AS total_members
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                """
-            ),
-            {"direction_id": direction_id},
-        ).fetchone()
+        )).fetchone()
+        metrics = await _metrics(conn, "vk", direction_id, ["total"])
+        unique_members = await _unique_users(conn, "vk", [direction_id])
     return VkSummaryResponse(
         direction_id=direction_id,
-        total_members=int(members_row[0] or 0),
+        total_members=_metric_total(metrics),
         group_count=int(group_row[0] or 0),
+        unique_members=unique_members,
     )
 
 
 @router.get("/vk/gender/{direction_id}", response_model=List[VkGenderItem])
-def vk_gender(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[VkGenderItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT COALESCE(gender, 'unknown') AS gender, COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY COALESCE(gender, 'unknown')
-                ORDER BY count DESC
-                """
-            ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    return [VkGenderItem(gender=row[0], count=row[1]) for row in rows]
+@cached
+async def vk_gender(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    rows = await _metric("vk", direction_id, "gender")
+    return _records(VkGenderItem, rows)
 
 
 @router.get("/vk/universities/{direction_id}", response_model=List[VkUniItem])
-def vk_universities(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> List[VkUniItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT COALESCE(university, 'unknown') AS university, COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY COALESCE(university, 'unknown')
-                ORDER BY count DESC
-                LIMIT 50
-                """
-            ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    return [VkUniItem(university=row[0], count=row[1]) for row in rows]
+@cached
+async def vk_universities(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    rows = await _metric("vk", direction_id, "university")
+    return _records(VkUniItem, rows)
 
 
 @router.get("/vk/schools/{direction_id}", response_model=List[VkSchoolItem])
-def vk_schools(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> List[VkSchoolItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT COALESCE(school, 'unknown') AS school, COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY COALESCE(school, 'unknown')
-                ORDER BY count DESC
-                LIMIT 50
-                """
-            ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    return [VkSchoolItem(school=row[0], count=row[1]) for row in rows]
+@cached
+async def vk_schools(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    rows = await _metric("vk", direction_id, "school")
+    return _records(VkSchoolItem, rows)
 
 
 @router.get("/vk/timeline/{direction_id}", response_model=List[VkTimelineItem])
-def vk_timeline(
+@cached
+async def vk_timeline(
+    direction_id: int,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    group_id: Optional[List[int]] = Query(None),
+    _: List[str] = Depends(require_any_role),
+) -> List[Dict[str, Any]]:
+    async with engine.connect() as conn:
+        rows = await _timeline(conn, "vk", direction_id, start, end, granularity, group_id)
+    return _records(VkTimelineItem, rows)
+
+
+@router.get("/vk/dashboard/{direction_id}", response_model=VkDashboardResponse)
+@cached
+async def vk_dashboard(
     direction_id: int, _: List[str] = Depends(require_any_role)
-) -> List[VkTimelineItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT to_char(m.scraped_at::date, 'YYYY-MM-DD') AS day, COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY m.scraped_at::date
-                ORDER BY m.scraped_at::date ASC
-                """
-            ),
+) -> Dict[str, Any]:
+    async with engine.connect() as conn:
+        group_row = (await conn.execute(
+            text("SELECT COUNT(*) FROM vk_groups WHERE direction_id = :direction_id"),
             {"direction_id": direction_id},
-        ).fetchall()
-    return [VkTimelineItem(day=row[0], count=row[1]) for row in rows]
+        )).fetchone()
+        metrics = await _metrics(
+            conn,
+            "vk",
+            direction_id,
+            ["total", "gender", "university", "school", "age", "city"],
+        )
+        timeline = await _timeline(conn, "vk", direction_id, None, None, "day", None)
+        unique_members = await _unique_users(conn, "vk", [direction_id])
+    return dict(
+        summary=VkSummaryResponse(
+            direction_id=direction_id,
+            total_members=_metric_total(metrics),
+            group_count=int(group_row[0] or 0),
+            unique_members=unique_members,
+        ),
+        gender=_records(VkGenderItem, metrics["gender"]),
+        universities=_records(VkUniItem, metrics["university"]),
+        schools=_records(VkSchoolItem, metrics["school"]),
+        age=_records(DistributionItem, metrics["age"]),
+        cities=_records(DistributionItem, metrics["city"]),
+        timeline=_records(VkTimelineItem, timeline),
+    )
 
 
 @router.get("/vk/search", response_model=VkMemberSearchResponse)
-def vk_search(
+@cached
+async def vk_search(
     direction_id: int,
-    q: str,
-    limit: int = 50,
+    q: str = Query(..., min_length=1, max_length=200),
+    gender: Optional[str] = None,
+    city: Optional[str] = None,
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
     _: List[str] = Depends(require_any_role),
-) -> VkMemberSearchResponse:
-    search = f"%{q.lower()}%"
-    with engine.connect() as conn:
-        rows = conn.execute(
+) -> Dict[str, Any]:
+    # Matching is served by the indexes from db/init/007_vk_member_search.sql:
+    # prefix LIKE on text_pattern_ops for short queries, substring LIKE and
+    # word similarity on the pg_trgm GIN indexes otherwise. Results are
+    # ranked exact id match, then prefix matches, then by similarity.
+    query = q.strip().lower()
+    if not query:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty search query")
+    params = {
+        "direction_id": direction_id,
+        "q": query,
+        "prefix": f"{_like_escape(query)}%",
+        "contains": f"%{_like_escape(query)}%",
+        "limit": limit,
+    }
+    if len(query) < SEARCH_MIN_TRIGRAM_LENGTH:
+        match = "LOWER(m.full_name) LIKE :prefix OR LOWER(m.vk_user_id) LIKE :prefix"
+    else:
+        match = """
+            LOWER(m.full_name) LIKE :contains
+            OR LOWER(m.vk_user_id) LIKE :contains
+            OR :q <% LOWER(m.full_name)
+        """
+    filters = []
+    if gender:
+        filters.append("AND m.gender = :gender")
+        params["gender"] = gender
+    if city:
+        filters.append("AND LOWER(m.city) = :city")
+        params["city"] = city.strip().lower()
+    if age_min is not None:
+        filters.append("AND m.age >= :age_min")
+        params["age_min"] = age_min
+    if age_max is not None:
+        filters.append("AND m.age <= :age_max")
+        params["age_max"] = age_max
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
-                """
-                SELECT m.vk_user_id, m.full_name, m.gender, m.age, m.city, m.university, m.school
+                f"""
+                SELECT m.vk_user_id, m.full_name, m.gender, m.age, m.city, m.university, m.school,
+                    CASE
+                        WHEN LOWER(m.vk_user_id) = :q THEN 2
+                        WHEN LOWER(m.full_name) LIKE :prefix OR LOWER(m.vk_user_id) LIKE :prefix
+                            THEN 1
+                        ELSE 0
+                    END
+                    + GREATEST(
+                        word_similarity(:q, LOWER(COALESCE(m.full_name, ''))),
+                        similarity(:q, LOWER(m.vk_user_id))
+                    ) AS score
                 FROM vk_members m
                 JOIN vk_groups g ON g.id = m.vk_group_id
                 WHERE g.direction_id = :direction_id
-                  AND (
-                    LOWER(m.vk_user_id) LIKE :search
-                    OR LOWER(m.full_name) LIKE :search
-                  )
-                ORDER BY m.vk_user_id
+                  AND ({match})
+                  {" ".join(filters)}
+                ORDER BY score DESC, m.vk_user_id
                 LIMIT :limit
                 """
             ),
-            {"direction_id": direction_id, "search": search, "limit": limit},
-        ).fetchall()
-    items = [
-        VkMemberItem(
-            vk_user_id=row[0],
-            full_name=row[1],
-            gender=row[2],
-            age=row[3],
-            city=row[4],
-            university=row[5],
-            school=row[6],
+            params,
+        )).fetchall()
+    items = _records(VkMemberItem, rows)
+    for item in items:
+        item["score"] = round(float(item["score"]), 4)
+    return {"items": items}
+
+
+async def _export_batches(platform: str, direction_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """Encode a direction's full list batch by batch from a server-side cursor."""
+    fields, query = EXPORT_SOURCES[platform]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            text(query).execution_options(yield_per=EXPORT_BATCH_SIZE),
+            {"direction_id": direction_id},
         )
-        for row in rows
-    ]
-    return VkMemberSearchResponse(items=items)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                writer.writerows(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield b"".join(
+                    orjson.dumps(
+                        dict(zip(fields, row)),
+                        default=_json_default,
+                        option=orjson.OPT_APPEND_NEWLINE,
+                    )
+                    for row in rows
+                )
+
+
+def _export_response(platform: str, direction_id: int, fmt: str) -> StreamingResponse:
+    filename = f"{platform}-{direction_id}.{fmt}"
+    return StreamingResponse(
+        _export_batches(platform, direction_id, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/vk/members/{direction_id}/export")
+async def vk_members_export(
+    direction_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    _: List[str] = Depends(require_any_role),
+) -> StreamingResponse:
+    """Every member of the direction as NDJSON or CSV, streamed as it is read."""
+    return _export_response("vk", direction_id, format)
+
+
+@router.get("/{platform}/users/{direction_id}/export")
+async def social_users_export(
+    platform: str,
+    direction_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    _: List[str] = Depends(require_any_role),
+) -> StreamingResponse:
+    """Every user of the direction's accounts as NDJSON or CSV, streamed as it is read."""
+    if platform not in ["instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    return _export_response(platform, direction_id, format)
 
 
 @router.get("/vk/age/{direction_id}", response_model=List[DistributionItem])
-def vk_age(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[DistributionItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT 
-                    CASE 
-                        WHEN age < 18 THEN '<18' 
-                        WHEN age BETWEEN 18 AND 24 THEN '18-24'
-                        WHEN age BETWEEN 25 AND 34 THEN '25-34'
-                        WHEN age BETWEEN 35 AND 44 THEN '35-44'
-                        WHEN age >= 45 THEN '45+'
-                        ELSE 'unknown'
-                    END AS age_group,
-                    COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY age_group
-                ORDER BY count DESC
-                """
-            ),
-            {"direction_id": direction_id}
-        ).fetchall()
-    return [DistributionItem(label=row[0], count=row[1]) for row in rows]
+@cached
+async def vk_age(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    rows = await _metric("vk", direction_id, "age")
+    return _records(DistributionItem, rows)
 
 
 @router.get("/vk/cities/{direction_id}", response_model=List[DistributionItem])
-def vk_cities(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[DistributionItem]:
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(
-                """
-                SELECT COALESCE(city, 'unknown') AS city, COUNT(*) AS count
-                FROM vk_members m
-                JOIN vk_groups g ON g.id = m.vk_group_id
-                WHERE g.direction_id = :direction_id
-                GROUP BY COALESCE(city, 'unknown')
-                ORDER BY count DESC
-                LIMIT 20
-                """
-            ),
-            {"direction_id": direction_id}
-        ).fetchall()
-    return [DistributionItem(label=row[0], count=row[1]) for row in rows]
+@cached
+async def vk_cities(direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    rows = await _metric("vk", direction_id, "city")
+    return _records(DistributionItem, rows)
 
 
 @router.get("/vk/groups/{direction_id}", response_model=DirectionGroupsResponse)
-def vk_groups(
+@cached
+async def vk_groups(
     direction_id: int, _: List[str] = Depends(require_any_role)
-) -> DirectionGroupsResponse:
-    with engine.connect() as conn:
-        rows = conn.execute(
+) -> Dict[str, Any]:
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
                 """
                 SELECT name, url, members_count
@@ -365,206 +1359,441 @@ def vk_groups(
                 """
             ),
             {"direction_id": direction_id},
-        ).fetchall()
-    items = [DirectionGroupsItem(name=row[0], url=row[1], members_count=row[2]) for row in rows]
-    return DirectionGroupsResponse(items=items)
+        )).fetchall()
+    return {"items": _records(DirectionGroupsItem, rows)}
 
 
-@router.get("/instagram/summary/{direction_id}", response_model=SocialSummaryResponse)
-def instagram_summary(
-    direction_id: int, _: List[str] = Depends(require_any_role)
+@router.get("/{platform}/summary/{direction_id}", response_model=SocialSummaryResponse)
+@cached
+async def social_summary(
+    platform: str, direction_id: int, _: List[str] = Depends(require_any_role)
 ) -> SocialSummaryResponse:
-    with engine.connect() as conn:
-        acc_row = conn.execute(
-            text("SELECT COUNT(*) FROM instagram_accounts WHERE direction_id = :did"),
-            {"did": direction_id},
-        ).fetchone()
-        usr_row = conn.execute(
-            text("""
-                SELECT COUNT(*) FROM instagram_users u
-                JOIN instagram_accounts a ON a.id = u.instagram_account_id
-                WHERE a.direction_id = :did
-            """),
+    if platform not in ["instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    async with engine.connect() as conn:
+        acc_row = (await conn.execute(
+            text(f"SELECT COUNT(*) FROM {platform}_accounts WHERE direction_id = :did"),
             {"did": direction_id},
-        ).fetchone()
+        )).fetchone()
+        metrics = await _metrics(conn, platform, direction_id, ["total"])
     return SocialSummaryResponse(
         direction_id=direction_id,
         accounts_count=int(acc_row[0] or 0),
-        users_count=int(usr_row[0] or 0),
+        users_count=_metric_total(metrics),
     )
 
 
 @router.get("/instagram/users/{direction_id}", response_model=InstagramUsersResponse)
-def instagram_users(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> InstagramUsersResponse:
-    with engine.connect() as conn:
-        rows = conn.execute(
+@cached
+async def instagram_users(
+    direction_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    _: List[str] = Depends(require_any_role),
+) -> Dict[str, Any]:
+    # Keyset order is (account id, username). The scan walks the direction's
+    # accounts in id order and reads each one's users from the UNIQUE
+    # (instagram_account_id, username) index, stopping once the page is full.
+    params = {"direction_id": direction_id, "limit": limit + 1}
+    account_keyset = user_keyset = ""
+    if cursor is not None:
+        params["after_account_id"], params["after_username"] = _decode_cursor(cursor, (int, str))
+        account_keyset = "AND a.id >= :after_account_id"
+        user_keyset = "AND (a.id > :after_account_id OR u.username > :after_username)"
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
-                """
-                SELECT u.username, u.url, u.location, u.sex, u.city
-                FROM instagram_users u
-                JOIN instagram_accounts a ON a.id = u.instagram_account_id
+                f"""
+                SELECT u.username, u.url, u.location, u.sex, u.city, a.id
+                FROM instagram_accounts a
+                CROSS JOIN LATERAL (
+                    SELECT u.username, u.url, u.location, u.sex, u.city
+                    FROM instagram_users u
+                    WHERE u.instagram_account_id = a.id
+                      {user_keyset}
+                    ORDER BY u.username
+                    LIMIT :limit
+                ) u
                 WHERE a.direction_id = :direction_id
-                ORDER BY u.username
-                LIMIT 500
+                  {account_keyset}
+                ORDER BY a.id, u.username
+                LIMIT :limit
                 """
             ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    items = [
-        InstagramUserItem(username=row[0], url=row[1], location=row[2], sex=row[3], city=row[4])
-        for row in rows
-    ]
-    return InstagramUsersResponse(items=items)
+            params,
+        )).fetchall()
+    rows, next_cursor = _page(rows, limit, lambda row: [row[5], row[0]])
+    return {"items": _records(InstagramUserItem, rows), "next_cursor": next_cursor}
 
 
 @router.get("/instagram/accounts/{direction_id}", response_model=InstagramAccountsResponse)
-def instagram_accounts(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> InstagramAccountsResponse:
-    with engine.connect() as conn:
-        rows = conn.execute(
+@cached
+async def instagram_accounts(
+    direction_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    _: List[str] = Depends(require_any_role),
+) -> Dict[str, Any]:
+    # Keyset order follows the UNIQUE (direction_id, username) index.
+    params = {"direction_id": direction_id, "limit": limit + 1}
+    keyset = ""
+    if cursor is not None:
+        (params["after_username"],) = _decode_cursor(cursor, (str,))
+        keyset = "AND username > :after_username"
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
-                """
+                f"""
                 SELECT username, url, name, location
                 FROM instagram_accounts
                 WHERE direction_id = :direction_id
+                  {keyset}
                 ORDER BY username
-                LIMIT 500
+                LIMIT :limit
                 """
             ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    items = [
-        InstagramAccountItem(username=row[0], url=row[1], name=row[2], location=row[3])
-        for row in rows
-    ]
-    return InstagramAccountsResponse(items=items)
-
-
-@router.get("/tiktok/summary/{direction_id}", response_model=SocialSummaryResponse)
-def tiktok_summary(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> SocialSummaryResponse:
-    with engine.connect() as conn:
-        acc_row = conn.execute(
-            text("SELECT COUNT(*) FROM tiktok_accounts WHERE direction_id = :did"),
-            {"did": direction_id},
-        ).fetchone()
-        usr_row = conn.execute(
-            text("""
-                SELECT COUNT(*) FROM tiktok_users u
-                JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
-                WHERE a.direction_id = :did
-            """),
-            {"did": direction_id},
-        ).fetchone()
-    return SocialSummaryResponse(
-        direction_id=direction_id,
-        accounts_count=int(acc_row[0] or 0),
-        users_count=int(usr_row[0] or 0),
-    )
+            params,
+        )).fetchall()
+    rows, next_cursor = _page(rows, limit, lambda row: [row[0]])
+    return {"items": _records(InstagramAccountItem, rows), "next_cursor": next_cursor}
 
 
 @router.get("/tiktok/users/{direction_id}", response_model=TikTokUsersResponse)
-def tiktok_users(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> TikTokUsersResponse:
-    with engine.connect() as conn:
-        rows = conn.execute(
+@cached
+async def tiktok_users(
+    direction_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    _: List[str] = Depends(require_any_role),
+) -> Dict[str, Any]:
+    # Keyset order is (account id, username), walked per account as in
+    # instagram_users.
+    params = {"direction_id": direction_id, "limit": limit + 1}
+    account_keyset = user_keyset = ""
+    if cursor is not None:
+        params["after_account_id"], params["after_username"] = _decode_cursor(cursor, (int, str))
+        account_keyset = "AND a.id >= :after_account_id"
+        user_keyset = "AND (a.id > :after_account_id OR u.username > :after_username)"
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
-                """
-                SELECT u.username, u.url, u.location, u.followers_count, u.sex, u.city
-                FROM tiktok_users u
-                JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
+                f"""
+                SELECT u.username, u.url, u.location, u.followers_count, u.sex, u.city, a.id
+                FROM tiktok_accounts a
+                CROSS JOIN LATERAL (
+                    SELECT u.username, u.url, u.location, u.followers_count, u.sex, u.city
+                    FROM tiktok_users u
+                    WHERE u.tiktok_account_id = a.id
+                      {user_keyset}
+                    ORDER BY u.username
+                    LIMIT :limit
+                ) u
                 WHERE a.direction_id = :direction_id
-                ORDER BY u.username
-                LIMIT 500
+                  {account_keyset}
+                ORDER BY a.id, u.username
+                LIMIT :limit
                 """
             ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    items = [
-        TikTokUserItem(
-            username=row[0], url=row[1], location=row[2],
-            followers_count=row[3], sex=row[4], city=row[5],
-        )
-        for row in rows
-    ]
-    return TikTokUsersResponse(items=items)
+            params,
+        )).fetchall()
+    rows, next_cursor = _page(rows, limit, lambda row: [row[6], row[0]])
+    return {"items": _records(TikTokUserItem, rows), "next_cursor": next_cursor}
 
 
 @router.get("/tiktok/accounts/{direction_id}", response_model=TikTokAccountsResponse)
-def tiktok_accounts(
-    direction_id: int, _: List[str] = Depends(require_any_role)
-) -> TikTokAccountsResponse:
-    with engine.connect() as conn:
-        rows = conn.execute(
+@cached
+async def tiktok_accounts(
+    direction_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    _: List[str] = Depends(require_any_role),
+) -> Dict[str, Any]:
+    # Most-followed first (accounts without a count last), id as tie-breaker;
+    # served by idx_tiktok_accounts_direction_followers.
+    params = {"direction_id": direction_id, "limit": limit + 1}
+    keyset = ""
+    if cursor is not None:
+        params["after_followers"], params["after_id"] = _decode_cursor(cursor, (int, int))
+        keyset = "AND (COALESCE(followers_count, -1), id) < (:after_followers, :after_id)"
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
             text(
-                """
-                SELECT username, url, name, location, followers_count
+                f"""
+                SELECT username, url, name, location, followers_count, id
                 FROM tiktok_accounts
                 WHERE direction_id = :direction_id
-                ORDER BY followers_count DESC NULLS LAST
-                LIMIT 500
+                  {keyset}
+                ORDER BY COALESCE(followers_count, -1) DESC, id DESC
+                LIMIT :limit
                 """
             ),
-            {"direction_id": direction_id},
-        ).fetchall()
-    items = [
-        TikTokAccountItem(
-            username=row[0], url=row[1], name=row[2],
-            location=row[3], followers_count=row[4],
+            params,
+        )).fetchall()
+    rows, next_cursor = _page(
+        rows, limit, lambda row: [row[4] if row[4] is not None else -1, row[5]]
+    )
+    return {"items": _records(TikTokAccountItem, rows), "next_cursor": next_cursor}
+
+
+@router.get("/{platform}/unique/{direction_id}", response_model=UniqueUsersResponse)
+@cached
+async def unique_users(
+    platform: str,
+    direction_id: int,
+    group_id: Optional[List[int]] = Query(None),
+    _: List[str] = Depends(require_any_role),
+) -> UniqueUsersResponse:
+    """Distinct users in a direction, or in a subset of its groups/accounts."""
+    if platform not in ["vk", "instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    async with engine.connect() as conn:
+        estimate = await _unique_users(conn, platform, [direction_id], group_id)
+    return UniqueUsersResponse(
+        platform=platform,
+        direction_ids=[direction_id],
+        group_ids=group_id,
+        unique_users=estimate,
+        relative_error=HLL_RELATIVE_ERROR,
+    )
+
+
+@router.get("/{platform}/unique", response_model=UniqueUsersResponse)
+async def unique_users_across(
+    platform: str,
+    direction_id: List[int] = Query(...),
+    _: List[str] = Depends(require_any_role),
+) -> UniqueUsersResponse:
+    """Distinct users across several directions (not cached: spans versions)."""
+    if platform not in ["vk", "instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    async with engine.connect() as conn:
+        estimate = await _unique_users(conn, platform, direction_id)
+    return UniqueUsersResponse(
+        platform=platform,
+        direction_ids=direction_id,
+        unique_users=estimate,
+        relative_error=HLL_RELATIVE_ERROR,
+    )
+
+
+@router.get("/{platform}/overlap/{direction_id}", response_model=OverlapResponse)
+@cached
+async def group_overlap(
+    platform: str,
+    direction_id: int,
+    group_id: Optional[List[int]] = Query(None),
+    _: List[str] = Depends(require_any_role),
+) -> OverlapResponse:
+    """Pairwise shared users between the groups/accounts of a direction.
+
+    Without ``group_id`` the OVERLAP_MAX_SETS largest groups are compared.
+    """
+    if platform not in ["vk", "instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    if group_id and len(group_id) > OVERLAP_MAX_SETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {OVERLAP_MAX_SETS} groups can be compared",
+        )
+    name_column = "name" if platform == "vk" else "username"
+    groups_table = "vk_groups" if platform == "vk" else f"{platform}_accounts"
+    params: Dict[str, Any] = {"platform": platform, "did": direction_id, "limit": OVERLAP_MAX_SETS}
+    scope = "s.group_id <> 0"
+    if group_id:
+        scope = "s.group_id = ANY(:group_ids)"
+        params["group_ids"] = group_id
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            text(
+                f"""
+                SELECT s.group_id, g.{name_column}, s.user_ids
+                FROM user_id_sets s
+                JOIN {groups_table} g ON g.id = s.group_id
+                WHERE s.platform = :platform AND s.direction_id = :did AND {scope}
+                ORDER BY s.cardinality DESC, s.group_id
+                LIMIT :limit
+                """
+            ),
+            params,
+        )).fetchall()
+    return await asyncio.to_thread(_overlap_response, platform, rows)
+
+
+@router.get("/{platform}/overlap", response_model=OverlapResponse)
+async def direction_overlap(
+    platform: str,
+    direction_id: List[int] = Query(...),
+    _: List[str] = Depends(require_any_role),
+) -> OverlapResponse:
+    """Pairwise shared users between directions (not cached: spans versions)."""
+    if platform not in ["vk", "instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    if len(direction_id) > OVERLAP_MAX_SETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {OVERLAP_MAX_SETS} directions can be compared",
         )
-        for row in rows
-    ]
-    return TikTokAccountsResponse(items=items)
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            text(
+                """
+                SELECT s.direction_id, d.name, s.user_ids
+                FROM user_id_sets s
+                JOIN directions d ON d.id = s.direction_id
+                WHERE s.platform = :platform AND s.direction_id = ANY(:direction_ids)
+                  AND s.group_id = :direction_set
+                ORDER BY s.direction_id
+                """
+            ),
+            {"platform": platform, "direction_ids": direction_id, "direction_set": DIRECTION_SKETCH},
+        )).fetchall()
+    return await asyncio.to_thread(_overlap_response, platform, rows)
 
 
-@router.get("/{platform}/gender/{direction_id}", response_model=List[DistributionItem])
-def social_gender(platform: str, direction_id: int, _: List[str] = Depends(require_any_role)) -> List[DistributionItem]:
+@router.get("/{platform}/metrics/{direction_id}", response_model=MetricsResponse)
+@cached
+async def platform_metrics(
+    platform: str,
+    direction_id: int,
+    metric: List[str] = Query(...),
+    mode: str = Query("exact", pattern=MODE_PATTERN),
+    _: List[str] = Depends(require_any_role),
+) -> Any:
+    """Any combination of METRICS entries, fetched with as few reads as possible.
+
+    ``mode=approx`` estimates the metrics that are not rolled up from one
+    sampled scan and adds ``sample``.
+    """
+    if platform not in METRICS:
+        raise HTTPException(status_code=404)
+    unknown = [name for name in metric if name not in METRICS[platform]]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metric {unknown[0]!r}; expected one of {', '.join(METRICS[platform])}",
+        )
+    names = list(dict.fromkeys(metric))
+    async with engine.connect() as conn:
+        if mode == "exact":
+            metrics, sample = await _metrics(conn, platform, direction_id, names), None
+        else:
+            metrics, sample = await _sampled_metrics(conn, platform, direction_id, names)
+    content = {
+        "platform": platform,
+        "direction_id": direction_id,
+        "metrics": {name: _records(DistributionItem, pairs) for name, pairs in metrics.items()},
+    }
+    if sample is None:
+        return content
+    content["sample"] = sample
+    return Response(orjson.dumps(content, default=_json_default), media_type="application/json")
+
+
+@router.get("/{platform}/cube/{direction_id}", response_model=CubeResponse)
+async def cube_query(
+    platform: str,
+    direction_id: int,
+    filter: Optional[List[str]] = Query(None, description="dimension:value, e.g. city:Almaty"),
+    group_by: Optional[List[str]] = Query(None),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    _: List[str] = Depends(require_any_role),
+) -> CubeResponse:
+    """Cross-filtered member counts from the direction's in-memory cube.
+
+    Directions too large for CUBE_MAX_BYTES are counted in SQL instead.
+    """
+    if platform not in CUBE_DIMENSIONS:
+        raise HTTPException(status_code=404)
+    dims = CUBE_DIMENSIONS[platform]
+    filters: Dict[str, List[str]] = {}
+    for item in filter or []:
+        dim, sep, value = item.partition(":")
+        if not sep or dim not in dims:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid filter {item!r}; expected one of {', '.join(dims)} as dimension:value",
+            )
+        filters.setdefault(dim, []).append(value)
+    group_by = list(dict.fromkeys(group_by or []))
+    unknown = [dim for dim in group_by if dim not in dims]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown group_by dimension {unknown[0]!r}; expected one of {', '.join(dims)}",
+        )
+    cube = await CUBE_CACHE.get(platform, direction_id)
+    if cube is None:
+        total, groups = await _scan_cube(platform, direction_id, group_by, filters)
+    else:
+        total, groups = cube.group_by(group_by, filters)
+    return CubeResponse(
+        platform=platform,
+        direction_id=direction_id,
+        group_by=group_by,
+        total=total,
+        rows=[CubeRow(values=values, count=count) for values, count in groups[:limit]],
+    )
+
+
+@router.get("/{platform}/dashboard/{direction_id}", response_model=SocialDashboardResponse)
+@cached
+async def social_dashboard(
+    platform: str, direction_id: int, _: List[str] = Depends(require_any_role)
+) -> Dict[str, Any]:
     if platform not in ["instagram", "tiktok"]:
         raise HTTPException(status_code=404)
-    table_usr = f"{platform}_users"
     table_acc = f"{platform}_accounts"
-    fk_field = f"{platform}_account_id"
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(f"""
-                SELECT COALESCE(sex, 'unknown') AS gender, COUNT(*) AS count
-                FROM {table_usr} u
-                JOIN {table_acc} a ON a.id = u.{fk_field}
-                WHERE a.direction_id = :did
-                GROUP BY gender
-                ORDER BY count DESC
-            """),
-            {"did": direction_id}
-        ).fetchall()
-    return [DistributionItem(label=row[0], count=row[1]) for row in rows]
+    async with engine.connect() as conn:
+        acc_row = (await conn.execute(
+            text(f"SELECT COUNT(*) FROM {table_acc} WHERE direction_id = :did"),
+            {"did": direction_id},
+        )).fetchone()
+        metrics = await _metrics(conn, platform, direction_id, ["total", "gender", "city"])
+    return dict(
+        summary=SocialSummaryResponse(
+            direction_id=direction_id,
+            accounts_count=int(acc_row[0] or 0),
+            users_count=_metric_total(metrics),
+        ),
+        gender=_records(DistributionItem, metrics["gender"]),
+        cities=_records(DistributionItem, metrics["city"]),
+    )
+
+
+@router.get("/{platform}/timeline/{direction_id}", response_model=List[TimelineItem])
+@cached
+async def social_timeline(
+    platform: str,
+    direction_id: int,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    group_id: Optional[List[int]] = Query(None),
+    _: List[str] = Depends(require_any_role),
+) -> List[Dict[str, Any]]:
+    if platform not in ["instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    async with engine.connect() as conn:
+        rows = await _timeline(conn, platform, direction_id, start, end, granularity, group_id)
+    return _records(TimelineItem, rows)
+
+
+@router.get("/{platform}/gender/{direction_id}", response_model=List[DistributionItem])
+@cached
+async def social_gender(platform: str, direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
+    if platform not in ["instagram", "tiktok"]:
+        raise HTTPException(status_code=404)
+    rows = await _metric(platform, direction_id, "gender")
+    return _records(DistributionItem, rows)
 
 
 @router.get("/{platform}/cities/{direction_id}", response_model=List[DistributionItem])
-def social_cities(platform: str, direction_id: int, _: List[str] = Depends(require_any_role)) -> List[DistributionItem]:
+@cached
+async def social_cities(platform: str, direction_id: int, _: List[str] = Depends(require_any_role)) -> List[Dict[str, Any]]:
     if platform not in ["instagram", "tiktok"]:
         raise HTTPException(status_code=404)
-    table_usr = f"{platform}_users"
-    table_acc = f"{platform}_accounts"
-    fk_field = f"{platform}_account_id"
-    with engine.connect() as conn:
-        rows = conn.execute(
-            text(f"""
-                SELECT COALESCE(city, 'unknown') AS city, COUNT(*) AS count
-                FROM {table_usr} u
-                JOIN {table_acc} a ON a.id = u.{fk_field}
-                WHERE a.direction_id = :did
-                GROUP BY city
-                ORDER BY count DESC
-                LIMIT 20
-            """),
-            {"did": direction_id}
-        ).fetchall()
-    return [DistributionItem(label=row[0], count=row[1]) for row in rows]
+    rows = await _metric(platform, direction_id, "city")
+    return _records(DistributionItem, rows)
 
 
 app.include_router(router)
@@ -0,0 +1,186 @@
+"""Serialization micro-benchmark for analytics list and distribution responses.
+
+Encodes the same synthetic DB rows two ways and reports the time per
+response:
+
+- ``models``: one pydantic item per row, jsonable_encoder, json.dumps (the
+  path the cached endpoints used before rows were encoded directly)
+- ``records``: ``_records`` dicts encoded with orjson (the current path)
+
+No database is needed; rows are shaped like the endpoints' SELECTs.
+
+    python bench/serialization.py
+    python bench/serialization.py --rows 2000 --output serialization.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from fastapi.encoders import jsonable_encoder
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+# The engine is created at import time but never connects here.
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+
+from app import main as service  # noqa: E402
+
+
+class Case(NamedTuple):
+    name: str
+    rows: List[tuple]
+    models: Callable[[List[tuple]], Any]
+    records: Callable[[List[tuple]], Any]
+
+
+def _vk_member_rows(n: int) -> List[tuple]:
+    return [
+        (
+            str(100000 + i), f"Пользователь {i}", "female" if i % 2 else "male",
+            18 + i % 40, "Алматы", "КазНУ", f"Школа №{i % 90}", 1.25,
+        )
+        for i in range(n)
+    ]
+
+
+def _instagram_user_rows(n: int) -> List[tuple]:
+    return [
+        (f"user{i}", f"https://instagram.com/user{i}", "Almaty", "female", "Алматы", 7)
+        for i in range(n)
+    ]
+
+
+def _tiktok_user_rows(n: int) -> List[tuple]:
+    return [
+        (f"user{i}", f"https://tiktok.com/@user{i}", "Almaty", 1000 + i, "male", "Астана", 7)
+        for i in range(n)
+    ]
+
+
+def _distribution_rows(n: int) -> List[tuple]:
+    return [(f"Университет {i}", 10_000 - i) for i in range(n)]
+
+
+def _vk_search_records(rows: List[tuple]) -> Dict[str, Any]:
+    items = service._records(service.VkMemberItem, rows)
+    for item in items:
+        item["score"] = round(float(item["score"]), 4)
+    return {"items": items}
+
+
+def cases(rows: int, distribution: int) -> List[Case]:
+    return [
+        Case(
+            "vk_search",
+            _vk_member_rows(rows),
+            lambda rs: service.VkMemberSearchResponse(items=[
+                service.VkMemberItem(
+                    vk_user_id=r[0], full_name=r[1], gender=r[2], age=r[3], city=r[4],
+                    university=r[5], school=r[6], score=round(float(r[7]), 4),
+                )
+                for r in rs
+            ]),
+            _vk_search_records,
+        ),
+        Case(
+            "instagram_users",
+            _instagram_user_rows(rows),
+            lambda rs: service.InstagramUsersResponse(items=[
+                service.InstagramUserItem(
+                    username=r[0], url=r[1], location=r[2], sex=r[3], city=r[4],
+                )
+                for r in rs
+            ], next_cursor=None),
+            lambda rs: {
+                "items": service._records(service.InstagramUserItem, rs),
+                "next_cursor": None,
+            },
+        ),
+        Case(
+            "tiktok_users",
+            _tiktok_user_rows(rows),
+            lambda rs: service.TikTokUsersResponse(items=[
+                service.TikTokUserItem(
+                    username=r[0], url=r[1], location=r[2],
+                    followers_count=r[3], sex=r[4], city=r[5],
+                )
+                for r in rs
+            ], next_cursor=None),
+            lambda rs: {
+                "items": service._records(service.TikTokUserItem, rs),
+                "next_cursor": None,
+            },
+        ),
+        Case(
+            "vk_universities",
+            _distribution_rows(distribution),
+            lambda rs: [service.VkUniItem(university=r[0], count=r[1]) for r in rs],
+            lambda rs: service._records(service.VkUniItem, rs),
+        ),
+    ]
+
+
+def encode_models(case: Case) -> bytes:
+    return json.dumps(
+        jsonable_encoder(case.models(case.rows)),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def encode_records(case: Case) -> bytes:
+    return service.orjson.dumps(case.records(case.rows), default=service._json_default)
+
+
+def measure(fn: Callable[[], bytes], repeat: int, number: int) -> float:
+    """Best per-call time in milliseconds over ``repeat`` runs of ``number`` calls."""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=500, help="rows per list response")
+    parser.add_argument("--distribution", type=int, default=50, help="items per distribution")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for case in cases(args.rows, args.distribution):
+        # Both paths must produce the same document for the comparison to hold.
+        if json.loads(encode_models(case)) != json.loads(encode_records(case)):
+            raise SystemExit(f"{case.name}: models and records encode differently")
+        before = measure(lambda: encode_models(case), args.repeat, args.number)
+        after = measure(lambda: encode_records(case), args.repeat, args.number)
+        print(
+            f"{case.name:<16} {len(case.rows):>5} rows  models {before:>8.3f}ms  "
+            f"records {after:>8.3f}ms  x{before / after:>5.1f}"
+        )
+        results.append({
+            "name": case.name,
+            "rows": len(case.rows),
+            "models_ms": round(before, 4),
+            "records_ms": round(after, 4),
+            "speedup": round(before / after, 2),
+        })
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+            "cases": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,43 @@
+import asyncio
+import gzip
+import hashlib
+import json
 import os
-from typing import Dict, Iterable, Tuple
+import math
+import random
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 import httpx
 from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from jose import JWTError, jwt
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
 
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
@@ -23,6 +55,59 @@ SERVICE_MAP: Dict[str, str] = {
 
 SCRAPING_SERVICE_URL = os.getenv("SCRAPING_SERVICE_URL", "")
 
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+SINGLEFLIGHT_SERVICES = {
+    s.strip() for s in os.getenv("SINGLEFLIGHT_SERVICES", "analytics").split(",") if s.strip()
+}
+
+# Each service URL may list several replicas separated by commas.
+# Upstream connection pool defaults; each can be overridden per upstream with
+# UPSTREAM_<NAME>_<SETTING>, e.g. UPSTREAM_ANALYTICS_MAX_CONNECTIONS=200.
+UPSTREAM_DEFAULTS: Dict[str, str] = {
+    "MAX_CONNECTIONS": os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"),
+    "MAX_KEEPALIVE": os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"),
+    "KEEPALIVE_EXPIRY": os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"),
+    "CONNECT_TIMEOUT": os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"),
+    "READ_TIMEOUT": os.getenv("UPSTREAM_READ_TIMEOUT", "60"),
+    "WRITE_TIMEOUT": os.getenv("UPSTREAM_WRITE_TIMEOUT", "60"),
+    "POOL_TIMEOUT": os.getenv("UPSTREAM_POOL_TIMEOUT", "10"),
+    "HTTP2": os.getenv("UPSTREAM_HTTP2", "false"),
+    "LB_POLICY": os.getenv("UPSTREAM_LB_POLICY", "round_robin"),
+    # Admission control: at most MAX_IN_FLIGHT requests awaiting the upstream
+    # (0 disables the limit), at most MAX_QUEUE more waiting for up to
+    # QUEUE_TIMEOUT seconds; beyond that requests are rejected with 503.
+    "MAX_IN_FLIGHT": os.getenv("UPSTREAM_MAX_IN_FLIGHT", "64"),
+    "MAX_QUEUE": os.getenv("UPSTREAM_MAX_QUEUE", "128"),
+    "QUEUE_TIMEOUT": os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5"),
+    # The breaker opens after BREAKER_FAILURES consecutive errors/timeouts
+    # and lets a single trial request through after BREAKER_COOLDOWN seconds.
+    "BREAKER_FAILURES": os.getenv("UPSTREAM_BREAKER_FAILURES", "5"),
+    "BREAKER_COOLDOWN": os.getenv("UPSTREAM_BREAKER_COOLDOWN", "10"),
+}
+LB_POLICIES = {"round_robin", "least_outstanding"}
+
+# Active health checks against each replica's /health endpoint: a replica is
+# ejected after HEALTH_CHECK_FALL failed probes and readmitted after
+# HEALTH_CHECK_RISE successful ones.
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+HEALTH_CHECK_FALL = int(os.getenv("HEALTH_CHECK_FALL", "3"))
+HEALTH_CHECK_RISE = int(os.getenv("HEALTH_CHECK_RISE", "2"))
+
+SCRAPE_IMPORT_TIMEOUT = float(os.getenv("SCRAPE_IMPORT_TIMEOUT", "1000"))
+ANALYTICS_EXPORT_TIMEOUT = float(os.getenv("ANALYTICS_EXPORT_TIMEOUT", "300"))
+
+# Retries apply only to body-less GETs on routes that allow them; the delay
+# before retry n is uniform in [0, min(RETRY_BACKOFF_MAX, BASE * 2**n)].
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "1"))
+RETRY_STATUSES = {502, 503, 504}
+
 HOP_BY_HOP_HEADERS = {
     "connection",
     "keep-alive",
@@ -35,6 +120,55 @@ HOP_BY_HOP_HEADERS = {
 }
 
 
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 10485760, 104857600)
+
+REQUEST_LATENCY = Histogram(
+    "gateway_request_duration_seconds",
+    "Time from request start to the last response byte, per gateway route.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "gateway_requests_total", "Gateway responses by route and status.", ["route", "method", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge("gateway_requests_in_flight", "Requests currently being handled.")
+REQUEST_BYTES = Histogram(
+    "gateway_request_size_bytes", "Request body size per route.", ["route"], buckets=SIZE_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    "gateway_response_size_bytes", "Response body size per route.", ["route"], buckets=SIZE_BUCKETS
+)
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_duration_seconds",
+    "Time from sending an upstream request to receiving its response headers.",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_CONNECT_LATENCY = Histogram(
+    "gateway_upstream_connect_duration_seconds",
+    "Time spent opening new upstream connections (TCP and TLS).",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_RESPONSES = Counter(
+    "gateway_upstream_responses_total",
+    "Upstream responses by status code, or 'error'/'timeout' when none arrived.",
+    ["upstream", "status"],
+)
+
+# Per-request Server-Timing entries (name -> seconds), set by MetricsMiddleware.
+REQUEST_TIMINGS: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _record_timing(name: str, seconds: float) -> None:
+    timings = REQUEST_TIMINGS.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
 app = FastAPI(title="TASPA API Gateway")
 app.router.redirect_slashes = False
 app.add_middleware(
@@ -46,9 +180,671 @@ app.add_middleware(
 )
 
 
-class ScrapeStartRequest(BaseModel):
-    service_name: str
-    direction_id: int
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+class BatchItemResult(BaseModel):
+    id: Optional[str]
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItemResult]
+
+
+class RouteSpec(NamedTuple):
+    """One gateway route: where it goes and how the upstream call behaves.
+
+    ``upstream_path`` is formatted with the route's path parameters.
+    ``timeout`` overrides the upstream's read/write timeout, ``retries`` is
+    the number of extra attempts for idempotent GETs, and ``body`` is either
+    ``"streamed"`` (bodies relayed as they arrive) or ``"buffered"`` (read in
+    full, eligible for single-flight, compression and ETags).
+    ``int_params`` are path parameters rejected with 422 unless they are
+    integers, as the upstream's own signature would.
+    """
+
+    path: str
+    methods: Tuple[str, ...]
+    upstream: str
+    upstream_path: str
+    auth: bool = True
+    timeout: Optional[float] = None
+    retries: int = 0
+    body: str = "streamed"
+    int_params: Tuple[str, ...] = ()
+
+
+def _path_params(route: RouteSpec, request: Request) -> Dict[str, Any]:
+    """The request's path parameters, with ``route.int_params`` parsed to int."""
+    params: Dict[str, Any] = dict(request.path_params)
+    errors = []
+    for name in route.int_params:
+        value = params[name]
+        try:
+            params[name] = int(value)
+        except ValueError:
+            errors.append({
+                "type": "int_parsing",
+                "loc": ("path", name),
+                "msg": "Input should be a valid integer, unable to parse string as an integer",
+                "input": value,
+            })
+    if errors:
+        raise RequestValidationError(errors)
+    return params
+
+
+class BufferedResponse(NamedTuple):
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    # Compressed bodies by content-coding, shared by every coalesced waiter.
+    encoded: Dict[str, bytes]
+
+
+def _overloaded(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight upstream requests with a bounded FIFO wait queue."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: "deque[asyncio.Future[None]]" = deque()
+
+    async def acquire(self) -> None:
+        if self.limit <= 0 or (self.in_flight < self.limit and not self._waiters):
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise _overloaded(f"Upstream {self.name} overloaded", 1)
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected += 1
+            raise _overloaded(f"Upstream {self.name} overloaded", self.queue_timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: "asyncio.Future[None]") -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as this waiter gave up.
+            self.release()
+        elif waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest waiter instead of freeing it,
+        # so newcomers cannot overtake the queue.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_total = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_request(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise _overloaded(f"Upstream {self.name} unavailable", remaining)
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise _overloaded(f"Upstream {self.name} unavailable", 1)
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.failure_threshold <= 0:
+            return
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_total += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Forget a request that ended without an upstream verdict."""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_total": self.opened_total,
+            "rejected": self.rejected,
+        }
+
+
+class Replica:
+    """One instance of an upstream service, tracked by the health checker."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.requests_total = 0
+        self.probe_failures = 0
+        self.probe_successes = 0
+
+    def record_probe(self, ok: bool) -> None:
+        if ok:
+            self.probe_failures = 0
+            self.probe_successes += 1
+            if not self.healthy and self.probe_successes >= HEALTH_CHECK_RISE:
+                self.healthy = True
+        else:
+            self.probe_successes = 0
+            self.probe_failures += 1
+            if self.healthy and self.probe_failures >= HEALTH_CHECK_FALL:
+                self.healthy = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests_total": self.requests_total,
+        }
+
+
+class Upstream:
+    """A backend service with its own long-lived, pooled HTTP client.
+
+    The service may run as several replicas (comma-separated base URLs); each
+    request is routed to one of the healthy replicas according to the
+    upstream's LB_POLICY, either ``round_robin`` or ``least_outstanding``.
+    """
+
+    def __init__(self, name: str, base_urls: str) -> None:
+        self.name = name
+        self.replicas = [Replica(u.strip()) for u in base_urls.split(",") if u.strip()]
+        self.client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.requests_total = 0
+        self.max_connections = int(self._setting("MAX_CONNECTIONS"))
+        self.max_keepalive = int(self._setting("MAX_KEEPALIVE"))
+        self.lb_policy = self._setting("LB_POLICY").lower()
+        if self.lb_policy not in LB_POLICIES:
+            raise ValueError(f"Unknown LB_POLICY {self.lb_policy!r} for upstream {name}")
+        self._next_replica = 0
+        self.limiter = ConcurrencyLimiter(
+            name,
+            int(self._setting("MAX_IN_FLIGHT")),
+            int(self._setting("MAX_QUEUE")),
+            float(self._setting("QUEUE_TIMEOUT")),
+        )
+        self.breaker = CircuitBreaker(
+            name,
+            int(self._setting("BREAKER_FAILURES")),
+            float(self._setting("BREAKER_COOLDOWN")),
+        )
+
+    def _setting(self, key: str) -> str:
+        return os.getenv(f"UPSTREAM_{self.name.upper()}_{key}", UPSTREAM_DEFAULTS[key])
+
+    def open(self) -> None:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=float(self._setting("KEEPALIVE_EXPIRY")),
+        )
+        timeout = httpx.Timeout(
+            connect=float(self._setting("CONNECT_TIMEOUT")),
+            read=float(self._setting("READ_TIMEOUT")),
+            write=float(self._setting("WRITE_TIMEOUT")),
+            pool=float(self._setting("POOL_TIMEOUT")),
+        )
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=self._setting("HTTP2").lower() == "true",
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def timeout(self, seconds: float) -> httpx.Timeout:
+        """This upstream's timeouts with read/write replaced by ``seconds``."""
+        base = self.client.timeout if self.client is not None else httpx.Timeout(seconds)
+        return httpx.Timeout(connect=base.connect, read=seconds, write=seconds, pool=base.pool)
+
+    def pick_replica(self) -> Replica:
+        # If every replica is failing its probes, keep sending traffic rather
+        # than rejecting everything on the strength of the health checker alone.
+        candidates = [r for r in self.replicas if r.healthy] or self.replicas
+        if self.lb_policy == "least_outstanding":
+            return min(candidates, key=lambda r: (r.outstanding, r.requests_total))
+        replica = candidates[self._next_replica % len(candidates)]
+        self._next_replica += 1
+        return replica
+
+    async def send(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a request and return as soon as the upstream headers arrive.
+
+        The body is left unread so callers can relay it with
+        ``_stream_response``. The request holds a limiter slot, and counts as
+        outstanding on its replica, until the response headers arrive.
+        Connection errors, timeouts and 5xx responses count against the
+        circuit breaker.
+        """
+        if self.client is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Upstream {self.name} not ready",
+            )
+        self.breaker.before_request()
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        replica = self.pick_replica()
+        connect_started: Dict[str, float] = {}
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            # httpcore emits these only when a new connection is opened.
+            if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                connect_started[event] = time.perf_counter()
+            elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                started = connect_started.pop(event.replace("complete", "started"), None)
+                if started is not None:
+                    elapsed = time.perf_counter() - started
+                    UPSTREAM_CONNECT_LATENCY.labels(self.name).observe(elapsed)
+                    _record_timing("upstream_connect", elapsed)
+
+        upstream_request = self.client.build_request(
+            method, f"{replica.base_url}{path}", extensions={"trace": trace}, **kwargs
+        )
+        self.in_flight += 1
+        self.requests_total += 1
+        replica.outstanding += 1
+        replica.requests_total += 1
+        started = time.perf_counter()
+        try:
+            resp = await self.client.send(upstream_request, stream=True)
+        except httpx.TimeoutException:
+            UPSTREAM_RESPONSES.labels(self.name, "timeout").inc()
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Upstream {self.name} timed out",
+            )
+        except httpx.TransportError:
+            UPSTREAM_RESPONSES.labels(self.name, "error").inc()
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Upstream {self.name} unreachable",
+            )
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.labels(self.name).observe(elapsed)
+            _record_timing("upstream", elapsed)
+            self.in_flight -= 1
+            replica.outstanding -= 1
+            self.limiter.release()
+        UPSTREAM_RESPONSES.labels(self.name, str(resp.status_code)).inc()
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    async def probe(self) -> None:
+        if self.client is None:
+            return
+
+        async def _probe(replica: Replica) -> None:
+            try:
+                resp = await self.client.get(
+                    f"{replica.base_url}/health", timeout=HEALTH_CHECK_TIMEOUT
+                )
+                replica.record_probe(resp.status_code == 200)
+            except httpx.HTTPError:
+                replica.record_probe(False)
+
+        await asyncio.gather(*(_probe(r) for r in self.replicas))
+
+    def stats(self) -> Dict[str, Any]:
+        connections = []
+        queued = 0
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+            queued = sum(1 for r in getattr(pool, "_requests", []) if r.is_queued())
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "open": self.client is not None,
+            "lb_policy": self.lb_policy,
+            "replicas": [r.stats() for r in self.replicas],
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "connections": len(connections),
+            "connections_idle": idle,
+            "connections_active": len(connections) - idle,
+            "queued": queued,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "limiter": self.limiter.stats(),
+            "breaker": self.breaker.stats(),
+        }
+
+
+# realtime-log-service/app/main.py has an identical copy of this class;
+# the services share no library, so change both together.
+class JwtCache:
+    """Bounded LRU of already verified tokens, keyed by SHA-256 of the token.
+
+    An entry lives until the token's ``exp`` claim, so a hit is exactly as
+    trustworthy as re-running ``jwt.decode``. Tokens without ``exp`` are
+    never cached.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, expires_at: Any, value: Dict[str, Any]) -> None:
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        self._entries[key] = (float(expires_at), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one in-flight upstream call.
+
+    The shared call runs in its own task, so a waiter that disconnects does
+    not cancel the result the other waiters are still expecting.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Task[BufferedResponse]"] = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[BufferedResponse]]
+    ) -> BufferedResponse:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task[BufferedResponse]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+JWT_CACHE = JwtCache(JWT_CACHE_SIZE)
+SINGLE_FLIGHT = SingleFlight()
+
+
+class MetricsMiddleware:
+    """Records per-route latency, status, in-flight and byte counts.
+
+    Implemented as plain ASGI so streamed bodies are measured as they pass
+    through, and so the Server-Timing header can be added to the response
+    start message once the handler has reached the upstream.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = REQUEST_TIMINGS.set(timings)
+        started = time.perf_counter()
+        request_bytes = 0
+        response_bytes = 0
+        status_code = 500
+
+        def route_label() -> str:
+            route = scope.get("route")
+            return route.path if route is not None else "unmatched"
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_bytes, status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings:
+                    server_timing = ", ".join(
+                        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", server_timing.encode("latin-1"))
+                    ]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            REQUEST_TIMINGS.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            route = route_label()
+            method = scope["method"]
+            REQUEST_LATENCY.labels(route, method).observe(time.perf_counter() - started)
+            REQUESTS_TOTAL.labels(route, method, str(status_code)).inc()
+            REQUEST_BYTES.labels(route).observe(request_bytes)
+            RESPONSE_BYTES.labels(route).observe(response_bytes)
+
+
+class GatewayStateCollector:
+    """Exports upstream pool, limiter, breaker and cache state at scrape time."""
+
+    def collect(self) -> Iterable[Any]:
+        gauges = {
+            "in_flight": GaugeMetricFamily(
+                "gateway_upstream_in_flight", "Requests awaiting upstream headers.", labels=["upstream"]
+            ),
+            "queued": GaugeMetricFamily(
+                "gateway_upstream_queue_depth", "Requests waiting for a limiter slot.", labels=["upstream"]
+            ),
+            "connections": GaugeMetricFamily(
+                "gateway_upstream_connections", "Open pooled connections.", labels=["upstream", "state"]
+            ),
+            "breaker": GaugeMetricFamily(
+                "gateway_upstream_breaker_open",
+                "Circuit breaker state: 0 closed, 1 half-open, 2 open.",
+                labels=["upstream"],
+            ),
+            "healthy": GaugeMetricFamily(
+                "gateway_upstream_replica_healthy", "1 if the replica passes health checks.",
+                labels=["upstream", "replica"],
+            ),
+        }
+        rejected = CounterMetricFamily(
+            "gateway_upstream_rejected", "Requests shed by the limiter or breaker.",
+            labels=["upstream", "reason"],
+        )
+        breaker_states = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        for name, upstream in UPSTREAMS.items():
+            stats = upstream.stats()
+            gauges["in_flight"].add_metric([name], stats["in_flight"])
+            gauges["queued"].add_metric([name], stats["limiter"]["queued"])
+            gauges["connections"].add_metric([name, "idle"], stats["connections_idle"])
+            gauges["connections"].add_metric([name, "active"], stats["connections_active"])
+            gauges["breaker"].add_metric([name], breaker_states[upstream.breaker.state])
+            for replica in upstream.replicas:
+                gauges["healthy"].add_metric([name, replica.base_url], int(replica.healthy))
+            rejected.add_metric([name, "limiter"], upstream.limiter.rejected)
+            rejected.add_metric([name, "breaker"], upstream.breaker.rejected)
+        yield from gauges.values()
+        yield rejected
+
+        jwt_cache = CounterMetricFamily(
+            "gateway_jwt_cache_lookups", "Verified-JWT cache lookups.", labels=["result"]
+        )
+        jwt_cache.add_metric(["hit"], JWT_CACHE.hits)
+        jwt_cache.add_metric(["miss"], JWT_CACHE.misses)
+        yield jwt_cache
+        coalesced = CounterMetricFamily(
+            "gateway_singleflight_requests", "GETs served by the single-flight layer.", labels=["role"]
+        )
+        coalesced.add_metric(["leader"], SINGLE_FLIGHT.leaders)
+        coalesced.add_metric(["coalesced"], SINGLE_FLIGHT.coalesced)
+        yield coalesced
+
+
+
+UPSTREAMS: Dict[str, Upstream] = {
+    name: Upstream(name, url) for name, url in SERVICE_MAP.items() if url
+}
+if SCRAPING_SERVICE_URL:
+    UPSTREAMS["scraping"] = Upstream("scraping", SCRAPING_SERVICE_URL)
+
+REGISTRY.register(GatewayStateCollector())
+app.add_middleware(MetricsMiddleware)
+
+
+HEALTH_CHECK_TASKS: List["asyncio.Task[None]"] = []
+
+
+async def _health_check_loop() -> None:
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        await asyncio.gather(*(u.probe() for u in UPSTREAMS.values()))
+
+
+@app.on_event("startup")
+def open_upstreams() -> None:
+    for upstream in UPSTREAMS.values():
+        upstream.open()
+    if HEALTH_CHECK_INTERVAL > 0:
+        HEALTH_CHECK_TASKS.append(asyncio.ensure_future(_health_check_loop()))
+
+
+@app.on_event("shutdown")
+async def close_upstreams() -> None:
+    for task in HEALTH_CHECK_TASKS:
+        task.cancel()
+    HEALTH_CHECK_TASKS.clear()
+    for upstream in UPSTREAMS.values():
+        await upstream.close()
 
 
 def _filter_headers(headers: Iterable[Tuple[str, str]]) -> Dict[str, str]:
@@ -61,16 +857,183 @@ def _filter_headers(headers: Iterable[Tuple[str, str]]) -> Dict[str, str]:
     return filtered
 
 
+def _request_body(request: Request) -> Optional[AsyncIterator[bytes]]:
+    """Return the incoming body as a stream, or None when there is no body."""
+    headers = request.headers
+    if "transfer-encoding" in headers or headers.get("content-length", "0") != "0":
+        return request.stream()
+    return None
+
+
+def _stream_response(resp: httpx.Response) -> StreamingResponse:
+    """Relay an upstream response chunk by chunk without buffering it."""
+    return StreamingResponse(
+        resp.aiter_raw(),
+        status_code=resp.status_code,
+        headers=_filter_headers(resp.headers.items()),
+        background=BackgroundTask(resp.aclose),
+    )
+
+
+async def _send(
+    route: RouteSpec, upstream: Upstream, method: str, path: str, **kwargs: Any
+) -> httpx.Response:
+    """Send through ``upstream`` with the route's timeout and retry policy."""
+    if route.timeout is not None:
+        kwargs["timeout"] = upstream.timeout(route.timeout)
+    has_body = kwargs.get("content") is not None or kwargs.get("json") is not None
+    retries = route.retries if method == "GET" and not has_body else 0
+    for attempt in range(retries + 1):
+        last_attempt = attempt == retries
+        try:
+            resp = await upstream.send(method, path, **kwargs)
+        except HTTPException as exc:
+            # 502/504 mean the upstream failed; a 503 raised here is our own
+            # limiter or breaker shedding load, which a retry would only worsen.
+            if last_attempt or exc.status_code not in (502, 504):
+                raise
+        else:
+            if last_attempt or resp.status_code not in RETRY_STATUSES:
+                return resp
+            await resp.aclose()
+        backoff = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)
+        await asyncio.sleep(random.uniform(0, backoff))
+    raise AssertionError("unreachable")
+
+
+async def _fetch_buffered(
+    route: RouteSpec, upstream: Upstream, method: str, path: str, **kwargs: Any
+) -> BufferedResponse:
+    # Let httpx negotiate and decode the upstream encoding; the body is
+    # re-encoded for the client by _buffered_response.
+    kwargs["headers"] = {
+        k: v for k, v in kwargs.get("headers", {}).items() if k.lower() != "accept-encoding"
+    }
+    resp = await _send(route, upstream, method, path, **kwargs)
+    try:
+        await resp.aread()
+    finally:
+        await resp.aclose()
+    headers = _filter_headers(resp.headers.items())
+    for key in [k for k in headers if k.lower() in ("content-encoding", "content-length")]:
+        del headers[key]
+    return BufferedResponse(resp.status_code, headers, resp.content, {})
+
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """Codings from an Accept-Encoding header that we can produce, best first."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted[coding.strip().lower()] = q
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return sorted(
+        (c for c in supported if c in accepted or "*" in accepted),
+        key=lambda c: -accepted.get(c, accepted.get("*", 0)),
+    )
+
+
+def _encode(buffered: BufferedResponse, coding: str) -> bytes:
+    body = buffered.encoded.get(coding)
+    if body is None:
+        if coding == "br":
+            body = brotli.compress(buffered.content, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(buffered.content, compresslevel=GZIP_LEVEL)
+        buffered.encoded[coding] = body
+    return body
+
+
+def _buffered_response(request: Request, buffered: BufferedResponse) -> Response:
+    """Answer with a 304 on a matching If-None-Match, else a compressed body.
+
+    Successful GET responses carry a strong ETag derived from the uncompressed
+    body; compressed representations get the coding appended so each
+    representation keeps a distinct strong validator.
+    """
+    headers = dict(buffered.headers)
+    if buffered.status_code != 200:
+        return Response(buffered.content, status_code=buffered.status_code, headers=headers)
+
+    cacheable = request.method in ("GET", "HEAD")
+    digest = hashlib.sha256(buffered.content).hexdigest()[:32]
+    content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+    coding = None
+    if len(buffered.content) >= COMPRESS_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+        codings = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        coding = codings[0] if codings else None
+    headers["Vary"] = "Accept-Encoding"
+    if cacheable:
+        headers["ETag"] = f'"{digest}-{coding}"' if coding else f'"{digest}"'
+        headers.setdefault("Cache-Control", "private, no-cache")
+
+    if_none_match = request.headers.get("if-none-match", "") if cacheable else ""
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in tags or any(t.strip('"').split("-", 1)[0] == digest for t in tags):
+            not_modified = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=not_modified)
+
+    if coding is None:
+        return Response(buffered.content, status_code=200, headers=headers)
+    headers["Content-Encoding"] = coding
+    return Response(_encode(buffered, coding), status_code=200, headers=headers)
+
+
+def _coalesced_get(
+    route: RouteSpec,
+    upstream: Upstream,
+    path: str,
+    params: Iterable[Tuple[str, str]],
+    headers: Dict[str, str],
+) -> Awaitable[BufferedResponse]:
+    """GET through the single-flight layer, keyed on path, query and role set."""
+    params = sorted(params)
+    roles = frozenset(r for r in headers.get("X-Roles", "").split(",") if r)
+    key = ("GET", upstream.name, path, tuple(params), roles)
+    return SINGLE_FLIGHT.do(
+        key,
+        lambda: _fetch_buffered(route, upstream, "GET", path, params=params, headers=headers),
+    )
+
+
+def _upstream_headers(request: Request, user_meta: Dict[str, str]) -> Dict[str, str]:
+    """Client headers to forward, with identity headers set only by the gateway."""
+    headers = _filter_headers(request.headers.items())
+    for key in [k for k in headers if k.lower() in ("host", "x-user-id", "x-roles")]:
+        del headers[key]
+    if user_meta:
+        headers["X-User-Id"] = user_meta["user_id"]
+        headers["X-Roles"] = user_meta["roles"]
+    return headers
+
+
 def _require_jwt(request: Request) -> Dict[str, str]:
     auth_header = request.headers.get("Authorization", "")
     if not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
     token = auth_header.replace("Bearer ", "", 1)
+    started = time.perf_counter()
+    cached = JWT_CACHE.get(token)
+    if cached is not None:
+        _record_timing("jwt", time.perf_counter() - started)
+        return cached
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return {"user_id": payload.get("sub", ""), "roles": ",".join(payload.get("roles", []))}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user_meta = {"user_id": payload.get("sub", ""), "roles": ",".join(payload.get("roles", []))}
+    JWT_CACHE.put(token, payload.get("exp"), user_meta)
+    _record_timing("jwt", time.perf_counter() - started)
+    return user_meta
 
 
 @app.get("/health")
@@ -78,226 +1041,237 @@ def health() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/scrape/start")
-async def scrape_start(data: ScrapeStartRequest, request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
-
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/jobs"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json=data.model_dump(), headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
 
-@app.get("/scrape/jobs")
-async def scrape_jobs(request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
+@app.get("/gateway/stats")
+def gateway_stats(request: Request) -> dict:
     user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
+    if "developer" not in user_meta["roles"].split(","):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Developer only")
+    return {
+        "upstreams": {name: upstream.stats() for name, upstream in UPSTREAMS.items()},
+        "jwt_cache": JWT_CACHE.stats(),
+        "single_flight": SINGLE_FLIGHT.stats(),
+    }
 
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/jobs"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
 
+async def _batch_call(item: BatchItem, headers: Dict[str, str]) -> BatchItemResult:
+    service = item.path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+    route = SERVICE_ROUTES.get(service) if service != "auth" else None
+    upstream = UPSTREAMS.get(service) if route is not None else None
+    if upstream is None or not item.path.startswith("/"):
+        return BatchItemResult(id=item.id, status=404, body={"detail": "Unknown service"})
 
-@app.get("/scrape/jobs/{job_id}")
-async def scrape_job_status(job_id: int, request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
+    method = item.method.upper()
+    path, _, query = item.path.partition("?")
+    params = httpx.QueryParams(query).multi_items()
+    try:
+        if method == "GET" and service in SINGLEFLIGHT_SERVICES:
+            resp = await _coalesced_get(route, upstream, path, params, headers)
+        else:
+            resp = await _fetch_buffered(
+                route, upstream, method, path, params=params, json=item.body, headers=headers
+            )
+    except HTTPException as exc:
+        return BatchItemResult(id=item.id, status=exc.status_code, body={"detail": exc.detail})
 
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/jobs/{job_id}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
+    body: Any = resp.content.decode("utf-8", errors="replace")
+    content_type = next(
+        (v for k, v in resp.headers.items() if k.lower() == "content-type"), ""
+    )
+    if "json" in content_type:
+        try:
+            body = json.loads(resp.content)
+        except ValueError:
+            pass
+    return BatchItemResult(id=item.id, status=resp.status_code, body=body)
 
 
-@app.post("/scrape/jobs/{job_id}/stop")
-async def scrape_job_stop(job_id: int, request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
+@app.post("/batch", response_model=BatchResponse)
+async def batch(data: BatchRequest, request: Request) -> Response:
     user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
-
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/jobs/{job_id}/stop"
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
-
-
-@app.get("/scrape/config")
-async def scrape_config(request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
+    if len(data.requests) > BATCH_MAX_REQUESTS:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_REQUESTS} requests per batch",
         )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
+    headers = _upstream_headers(request, user_meta)
+    for key in [k for k in headers if k.lower() in ("content-length", "content-type")]:
+        del headers[key]
 
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/config"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
+    results = await asyncio.gather(*(_batch_call(item, headers) for item in data.requests))
+    content = BatchResponse(responses=list(results)).model_dump_json().encode("utf-8")
+    return _buffered_response(
+        request, BufferedResponse(200, {"Content-Type": "application/json"}, content, {})
+    )
 
 
-@app.get("/scrape/config/{service_name}")
-async def scrape_config_service(service_name: str, request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
-
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/config/{service_name}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
-
-
-@app.put("/scrape/config/{service_name}")
-async def scrape_config_update(
-    service_name: str, request: Request
-) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
-    body = await request.body()
-
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/config/{service_name}"
-    async with httpx.AsyncClient() as client:
-        resp = await client.put(url, content=body, headers=headers)
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
-
+def _route_handler(route: RouteSpec) -> Callable[[Request], Awaitable[Response]]:
+    async def handler(request: Request) -> Response:
+        path_params = _path_params(route, request)
+        upstream = UPSTREAMS.get(route.upstream)
+        if upstream is None:
+            if route.upstream in SERVICE_MAP:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown service")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"{route.upstream.capitalize()} service not configured",
+            )
+        user_meta = _require_jwt(request) if route.auth else {}
+        path = route.upstream_path.format(**path_params)
+        headers = _upstream_headers(request, user_meta)
+        params = request.query_params.multi_items()
 
-@app.api_route("/scrape/import/{platform}-{format}", methods=["POST"])
-async def scrape_import(platform: str, format: str, request: Request) -> Response:
-    if not SCRAPING_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Scraping service not configured",
-        )
-    user_meta = _require_jwt(request)
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    headers.pop("content-type", None)
-    headers.pop("content-length", None)
-    headers["X-User-Id"] = user_meta["user_id"]
-    headers["X-Roles"] = user_meta["roles"]
-
-    url = f"{SCRAPING_SERVICE_URL.rstrip('/')}/scrape/import/{platform}-{format}"
-
-    async with httpx.AsyncClient(timeout=1000.0) as client:
-        if "multipart/form-data" in request.headers.get("content-type", ""):
-            form_data = await request.form()
-            files = {}
-            data = {}
-            for key, value in form_data.items():
-                if hasattr(value, 'file'):
-                    files[key] = (value.filename, value.file, value.content_type)
-                else:
-                    data[key] = value
-
-            resp = await client.post(
-                url,
-                params=request.query_params,
-                files=files,
-                data=data,
+        if route.body == "streamed":
+            resp = await _send(
+                route,
+                upstream,
+                request.method,
+                path,
+                params=params,
+                content=_request_body(request),
                 headers=headers,
             )
+            return _stream_response(resp)
+
+        body = await request.body()
+        if request.method == "GET" and not body and route.upstream in SINGLEFLIGHT_SERVICES:
+            buffered = await _coalesced_get(route, upstream, path, params, headers)
         else:
-            body = await request.body()
-            resp = await client.post(
-                url,
-                params=request.query_params,
-                content=body,
+            buffered = await _fetch_buffered(
+                route,
+                upstream,
+                request.method,
+                path,
+                params=params,
+                content=body or None,
                 headers=headers,
             )
+        return _buffered_response(request, buffered)
 
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
-
+    return handler
 
-@app.api_route("/{service}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
-@app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
-async def proxy(service: str, request: Request, path: str = "") -> Response:
-    base_url = SERVICE_MAP.get(service)
-    if not base_url:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown service")
 
-    if service != "auth":
-        user_meta = _require_jwt(request)
-    else:
-        user_meta = {}
+PROXY_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
 
-    full_path = service if not path else f"{service}/{path}"
-    url = f"{base_url.rstrip('/')}/{full_path}"
-    headers = _filter_headers(request.headers.items())
-    headers.pop("host", None)
-    if user_meta:
-        headers["X-User-Id"] = user_meta["user_id"]
-        headers["X-Roles"] = user_meta["roles"]
+# Generic pass-through policy per SERVICE_MAP entry: every path under
+# /<service> is forwarded unchanged to the same path on the upstream.
+SERVICE_ROUTES: Dict[str, RouteSpec] = {
+    "auth": RouteSpec(
+        "/auth/{path:path}", PROXY_METHODS, "auth", "/auth/{path}", auth=False, timeout=15
+    ),
+    "directions": RouteSpec(
+        "/directions/{path:path}",
+        PROXY_METHODS,
+        "directions",
+        "/directions/{path}",
+        timeout=15,
+        retries=2,
+        body="buffered",
+    ),
+    "analytics": RouteSpec(
+        "/analytics/{path:path}",
+        PROXY_METHODS,
+        "analytics",
+        "/analytics/{path}",
+        timeout=60,
+        retries=2,
+        body="buffered",
+    ),
+    "export": RouteSpec("/export/{path:path}", PROXY_METHODS, "export", "/export/{path}", timeout=300),
+}
 
-    body = await request.body()
-    async with httpx.AsyncClient() as client:
-        resp = await client.request(
-            request.method,
-            url,
-            params=request.query_params,
-            content=body,
-            headers=headers,
+ROUTES: List[RouteSpec] = [
+    RouteSpec("/scrape/start", ("POST",), "scraping", "/scrape/jobs", timeout=15, body="buffered"),
+    RouteSpec("/scrape/jobs", ("GET",), "scraping", "/scrape/jobs", timeout=15, retries=2),
+    RouteSpec(
+        "/scrape/jobs/{job_id}",
+        ("GET",),
+        "scraping",
+        "/scrape/jobs/{job_id}",
+        timeout=15,
+        retries=2,
+        int_params=("job_id",),
+    ),
+    RouteSpec(
+        "/scrape/jobs/{job_id}/stop",
+        ("POST",),
+        "scraping",
+        "/scrape/jobs/{job_id}/stop",
+        timeout=15,
+        int_params=("job_id",),
+    ),
+    RouteSpec("/scrape/config", ("GET",), "scraping", "/scrape/config", timeout=15, retries=2),
+    RouteSpec(
+        "/scrape/config/{service_name}",
+        ("GET",),
+        "scraping",
+        "/scrape/config/{service_name}",
+        timeout=15,
+        retries=2,
+    ),
+    RouteSpec(
+        "/scrape/config/{service_name}",
+        ("PUT",),
+        "scraping",
+        "/scrape/config/{service_name}",
+        timeout=15,
+        body="buffered",
+    ),
+    RouteSpec(
+        "/scrape/import/{platform}-{format}",
+        ("POST",),
+        "scraping",
+        "/scrape/import/{platform}-{format}",
+        timeout=SCRAPE_IMPORT_TIMEOUT,
+    ),
+    RouteSpec(
+        "/scrape/sketches/rebuild",
+        ("POST",),
+        "scraping",
+        "/scrape/sketches/rebuild",
+        timeout=SCRAPE_IMPORT_TIMEOUT,
+    ),
+    # Full-list exports are relayed as they stream instead of being buffered
+    # like the rest of /analytics.
+    RouteSpec(
+        "/analytics/vk/members/{direction_id:int}/export",
+        ("GET",),
+        "analytics",
+        "/analytics/vk/members/{direction_id}/export",
+        timeout=ANALYTICS_EXPORT_TIMEOUT,
+    ),
+    RouteSpec(
+        "/analytics/{platform}/users/{direction_id:int}/export",
+        ("GET",),
+        "analytics",
+        "/analytics/{platform}/users/{direction_id}/export",
+        timeout=ANALYTICS_EXPORT_TIMEOUT,
+    ),
+]
+for service_route in SERVICE_ROUTES.values():
+    ROUTES.append(
+        service_route._replace(
+            path=service_route.path.replace("/{path:path}", ""),
+            upstream_path=service_route.upstream_path.replace("/{path}", ""),
         )
+    )
+    ROUTES.append(service_route)
+
+for gateway_route in ROUTES:
+    app.add_api_route(
+        gateway_route.path,
+        _route_handler(gateway_route),
+        methods=list(gateway_route.methods),
+        name=f"{gateway_route.upstream}:{gateway_route.path}:{','.join(gateway_route.methods)}",
+        include_in_schema=False,
+    )
+
 
-    response_headers = _filter_headers(resp.headers.items())
-    return Response(content=resp.content, status_code=resp.status_code, headers=response_headers)
+@app.api_route("/{service}", methods=list(PROXY_METHODS))
+@app.api_route("/{service}/{path:path}", methods=list(PROXY_METHODS))
+async def unknown_service(service: str, path: str = "") -> Response:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown service")
@@ -0,0 +1,337 @@
+"""Gateway overhead benchmark.
+
+Starts ``stub.py`` as the only upstream, starts the gateway pointed at it and
+drives each scenario at a fixed concurrency. Latency percentiles, throughput
+and gateway memory are written to a JSON file so runs can be diffed before and
+after gateway changes.
+
+    python bench/bench.py --output bench-results.json
+    python bench/bench.py --scenario small_json --scenario batch_fanout
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+from jose import jwt
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GATEWAY_DIR = os.path.dirname(BENCH_DIR)
+JWT_SECRET = "bench-secret"
+
+
+class Scenario(NamedTuple):
+    name: str
+    concurrency: int
+    requests: int
+    build: Callable[[int], Dict[str, Any]]
+
+
+def _multipart_stream(size: int, boundary: str) -> Callable[[], AsyncIterator[bytes]]:
+    chunk = b"1;user;Almaty\n" * 4681  # ~64 KiB of CSV-ish rows
+
+    async def gen() -> AsyncIterator[bytes]:
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="bench.csv"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode()
+        sent = 0
+        while sent < size:
+            part = chunk[: size - sent]
+            sent += len(part)
+            yield part
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    return gen
+
+
+def _import_request(size: int) -> Callable[[int], Dict[str, Any]]:
+    boundary = "gateway-bench-boundary"
+
+    def build(i: int) -> Dict[str, Any]:
+        return {
+            "method": "POST",
+            "url": "/scrape/import/vk-csv",
+            "params": {"direction_id": 1},
+            "headers": {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            "content": _multipart_stream(size, boundary),
+        }
+
+    return build
+
+
+def _batch_request(fanout: int) -> Callable[[int], Dict[str, Any]]:
+    def build(i: int) -> Dict[str, Any]:
+        items = [
+            {"id": str(n), "path": f"/analytics/vk/summary/{n}?r={i}"} for n in range(fanout)
+        ]
+        return {"method": "POST", "url": "/batch", "json": {"requests": items}}
+
+    return build
+
+
+def scenarios(args: argparse.Namespace) -> List[Scenario]:
+    # A distinct query string per request keeps single-flight from collapsing
+    # the load into one upstream call, so the numbers reflect per-request cost.
+    return [
+        Scenario(
+            "small_json",
+            args.concurrency,
+            args.requests,
+            lambda i: {"method": "GET", "url": "/analytics/vk/summary/1", "params": {"r": i}},
+        ),
+        Scenario(
+            "list_500",
+            args.concurrency,
+            args.requests,
+            lambda i: {
+                "method": "GET",
+                "url": "/analytics/vk/users/1",
+                "params": {"r": i},
+                "headers": {"Accept-Encoding": "gzip"},
+            },
+        ),
+        Scenario(
+            "import_200mb",
+            args.import_concurrency,
+            args.import_requests,
+            _import_request(args.import_mb * 1024 * 1024),
+        ),
+        Scenario(
+            "batch_fanout",
+            args.concurrency,
+            max(1, args.requests // 4),
+            _batch_request(args.batch_fanout),
+        ),
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(app: str, app_dir: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            "--app-dir",
+            app_dir,
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env={**os.environ, **env},
+    )
+
+
+def _wait_ready(url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def _memory_kb(pid: int) -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of ``pid`` from /proc (Linux only)."""
+    values: Dict[str, Optional[int]] = {"rss_kb": None, "peak_rss_kb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return values
+
+
+def _reset_peak_rss(pid: int) -> bool:
+    """Reset VmHWM of ``pid`` to its current RSS so the peak is per scenario."""
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(
+    scenario: Scenario, base_url: str, token: str, gateway_pid: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    counter = iter(range(scenario.requests))
+    limits = httpx.Limits(max_connections=scenario.concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=600
+    ) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for i in counter:
+                kwargs = scenario.build(i)
+                if callable(kwargs.get("content")):
+                    kwargs["content"] = kwargs["content"]()
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(**kwargs)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                key = str(resp.status_code)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        peak_reset = _reset_peak_rss(gateway_pid)
+        memory_before = _memory_kb(gateway_pid)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+        elapsed = time.perf_counter() - started
+        memory_after = _memory_kb(gateway_pid)
+
+    latencies.sort()
+    return {
+        "name": scenario.name,
+        "concurrency": scenario.concurrency,
+        "requests": scenario.requests,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "gateway_memory_kb": {
+            "rss_before": memory_before["rss_kb"],
+            "rss_after": memory_after["rss_kb"],
+            # Without the reset VmHWM is the process's lifetime peak, which
+            # would include earlier scenarios.
+            "peak_rss": memory_after["peak_rss_kb"] if peak_reset else None,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--scenario", action="append", help="run only the named scenario(s)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--import-mb", type=int, default=200)
+    parser.add_argument("--import-concurrency", type=int, default=2)
+    parser.add_argument("--import-requests", type=int, default=4)
+    parser.add_argument("--batch-fanout", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    args = parser.parse_args()
+
+    selected = [s for s in scenarios(args) if not args.scenario or s.name in args.scenario]
+    if not selected:
+        parser.error(f"no scenario matches {args.scenario}")
+
+    stub_port, gateway_port = _free_port(), _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+    gateway_env = {
+        "JWT_SECRET": JWT_SECRET,
+        "AUTH_SERVICE_URL": stub_url,
+        "DIRECTION_SERVICE_URL": stub_url,
+        "ANALYTICS_SERVICE_URL": stub_url,
+        "EXPORT_SERVICE_URL": stub_url,
+        "SCRAPING_SERVICE_URL": stub_url,
+    }
+    token = jwt.encode(
+        {"sub": "1", "roles": ["developer"], "exp": int(time.time()) + 24 * 3600},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+    stub = _start("stub:app", BENCH_DIR, stub_port, {})
+    gateway = _start("app.main:app", GATEWAY_DIR, gateway_port, gateway_env)
+    try:
+        _wait_ready(f"{stub_url}/health")
+        _wait_ready(f"{gateway_url}/health")
+        if args.warmup:
+            warmup = Scenario(
+                "warmup",
+                min(args.concurrency, args.warmup),
+                args.warmup,
+                lambda i: {"method": "GET", "url": "/analytics/warmup", "params": {"r": i}},
+            )
+            asyncio.run(run_scenario(warmup, gateway_url, token, gateway.pid))
+
+        results = []
+        for scenario in selected:
+            result = asyncio.run(run_scenario(scenario, gateway_url, token, gateway.pid))
+            latency = result["latency_ms"]
+            print(
+                f"{result['name']:<14} {result['rps']:>9.1f} req/s  "
+                f"p50 {latency['p50']:>8.2f}ms  p95 {latency['p95']:>8.2f}ms  "
+                f"p99 {latency['p99']:>8.2f}ms  rss {result['gateway_memory_kb']['rss_after']} kB"
+            )
+            results.append(result)
+    finally:
+        for proc in (gateway, stub):
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "scenarios": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=GATEWAY_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
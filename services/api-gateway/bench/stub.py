@@ -0,0 +1,43 @@
+"""Canned upstream used by bench.py in place of every gateway upstream."""
+
+import json
+
+from fastapi import FastAPI, Request, Response
+
+app = FastAPI(title="Gateway Bench Stub")
+
+SMALL_BODY = json.dumps({"direction_id": 1, "total": 1234, "male": 610, "female": 624}).encode()
+LIST_BODY = json.dumps(
+    [
+        {
+            "account_id": 100000 + i,
+            "username": f"user{i}",
+            "full_name": f"User {i}",
+            "city": "Almaty",
+            "gender": "female" if i % 2 else "male",
+            "age": 18 + i % 40,
+            "group_name": "Bench group",
+        }
+        for i in range(500)
+    ]
+).encode()
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.post("/scrape/import/{source}")
+async def scrape_import(source: str, request: Request):
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+    return {"source": source, "received_bytes": received}
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def canned(path: str, request: Request):
+    await request.body()
+    body = LIST_BODY if "/users/" in f"/{path}/" else SMALL_BODY
+    return Response(body, media_type="application/json")
@@ -75,9 +75,23 @@ def _load_instagram_sources(direction_id: int) -> list[str]:
     return [row[0] for row in rows]
 
 
+def _bump_data_version(conn, direction_id: int) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO direction_data_versions (direction_id, version, updated_at)
+            VALUES (:direction_id, 1, NOW())
+            ON CONFLICT (direction_id)
+            DO UPDATE SET version = direction_data_versions.version + 1, updated_at = NOW()
+            """
+        ),
+        {"direction_id": direction_id},
+    )
+
+
 def _register_instagram_account(direction_id: int, username: str) -> None:
     with engine.begin() as conn:
-        conn.execute(
+        result = conn.execute(
             text(
                 """
                 INSERT INTO instagram_accounts (direction_id, username)
@@ -87,6 +101,8 @@ def _register_instagram_account(direction_id: int, username: str) -> None:
             ),
             {"direction_id": direction_id, "username": username},
         )
+        if result.rowcount:
+            _bump_data_version(conn, direction_id)
 
 
 def _send_log(job_id: int, level: str, message: str) -> None:
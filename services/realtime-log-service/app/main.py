@@ -1,6 +1,9 @@
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs
 
 import socketio
@@ -13,6 +16,7 @@ from sqlalchemy import create_engine, text
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
 ALL_ROLES = {"user", "admin", "developer"}
@@ -29,6 +33,64 @@ class LogEvent(BaseModel):
     message: str
 
 
+# Identical copy of JwtCache in api-gateway/app/main.py; the services
+# share no library, so change both together.
+class JwtCache:
+    """Bounded LRU of already verified tokens, keyed by SHA-256 of the token.
+
+    An entry lives until the token's ``exp`` claim, so a hit is exactly as
+    trustworthy as re-running ``jwt.decode``. Tokens without ``exp`` are
+    never cached.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, expires_at: Any, value: Dict[str, Any]) -> None:
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        self._entries[key] = (float(expires_at), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+JWT_CACHE = JwtCache(JWT_CACHE_SIZE)
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    payload = JWT_CACHE.get(token)
+    if payload is None:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        JWT_CACHE.put(token, payload.get("exp"), payload)
+    return payload
+
+
 def _get_roles(request: Request) -> List[str]:
     roles_header = request.headers.get("X-Roles", "")
     roles = [r.strip() for r in roles_header.split(",") if r.strip()]
@@ -51,7 +113,7 @@ async def connect(sid, environ):
     token = query.get("token", [None])[0]
     if token:
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            payload = _decode_token(token)
             roles = payload.get("roles", [])
             if roles:
                 await sio.enter_room(sid, "authorized")
@@ -71,6 +133,11 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@fastapi_app.get("/stats")
+def stats(_: List[str] = Depends(require_any_role)) -> dict:
+    return {"jwt_cache": JWT_CACHE.stats()}
+
+
 def _store_log(job_id: int, level: str, message: str) -> None:
     with engine.begin() as conn:
         conn.execute(
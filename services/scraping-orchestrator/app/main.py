@@ -1,9 +1,10 @@
 import csv
+import hashlib
 import io
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pika
 from fastapi import Depends, FastAPI, File, HTTPException, Request, UploadFile, status
@@ -344,6 +345,270 @@ def _convert_gender(raw: str) -> Optional[str]:
 
 CHUNK_SIZE = 5000
 
+# Dimension/value pairs maintained in analytics_rollups for one member row
+# aliased ``r``; must stay in sync with db/init/004_analytics_rollups.sql.
+# Counts per scrape day go to daily_rollups instead.
+VK_ROLLUP_DIMENSIONS = """
+    ('total', ''),
+    ('gender', COALESCE(r.gender, 'unknown')),
+    ('age', CASE
+                WHEN r.age < 18 THEN '<18'
+                WHEN r.age BETWEEN 18 AND 24 THEN '18-24'
+                WHEN r.age BETWEEN 25 AND 34 THEN '25-34'
+                WHEN r.age BETWEEN 35 AND 44 THEN '35-44'
+                WHEN r.age >= 45 THEN '45+'
+                ELSE 'unknown'
+            END),
+    ('city', COALESCE(r.city, 'unknown')),
+    ('university', COALESCE(r.university, 'unknown')),
+    ('school', COALESCE(r.school, 'unknown'))
+"""
+
+SOCIAL_ROLLUP_DIMENSIONS = """
+    ('total', ''),
+    ('gender', COALESCE(r.sex, 'unknown')),
+    ('city', COALESCE(r.city, 'unknown'))
+"""
+
+
+def _lock_direction(conn, direction_id: int) -> None:
+    """Serialize derived-data writes for a direction until the transaction ends."""
+    conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+        {"key": f"analytics_rollups:{direction_id}"},
+    )
+
+
+def _bump_data_version(conn, direction_id: int) -> None:
+    """Invalidate analytics-service's cached results for the direction.
+
+    See db/init/005_direction_data_versions.sql. The platform scrapers run
+    the same statement when they register groups and accounts.
+    """
+    conn.execute(
+        text("""
+            INSERT INTO direction_data_versions (direction_id, version, updated_at)
+            VALUES (:direction_id, 1, NOW())
+            ON CONFLICT (direction_id)
+            DO UPDATE SET version = direction_data_versions.version + 1, updated_at = NOW()
+        """),
+        {"direction_id": direction_id},
+    )
+
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+DIRECTION_SKETCH = 0  # user_sketches.group_id of the direction-wide sketch
+
+
+class HyperLogLog:
+    """HyperLogLog sketch of user ids: 2**14 one-byte registers, ~0.8% error.
+
+    The serialized form is the raw register array. analytics-service merges
+    and estimates the same bytes, so the precision and hash must not change
+    without rebuilding every stored sketch.
+    """
+
+    def __init__(self, registers: Optional[bytes] = None) -> None:
+        self.registers = bytearray(registers) if registers else bytearray(HLL_REGISTERS)
+
+    def add(self, value: str) -> None:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        x = int.from_bytes(digest, "big")
+        index = x >> (64 - HLL_PRECISION)
+        rest = x & ((1 << (64 - HLL_PRECISION)) - 1)
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+
+def _build_sketches(members: Iterable[Tuple[int, str]]) -> Dict[int, HyperLogLog]:
+    """Per-group sketches plus the direction-wide one under DIRECTION_SKETCH."""
+    sketches: Dict[int, HyperLogLog] = {}
+    for group_id, user_id in members:
+        sketch = sketches.get(group_id)
+        if sketch is None:
+            sketch = sketches[group_id] = HyperLogLog()
+        sketch.add(user_id)
+    direction = HyperLogLog()
+    for sketch in sketches.values():
+        direction.merge(sketch)
+    sketches[DIRECTION_SKETCH] = direction
+    return sketches
+
+
+def _merge_user_sketches(
+    conn, direction_id: int, platform: str, members: Iterable[Tuple[int, str]]
+) -> None:
+    """Fold ``(group_id, user_id)`` pairs into the stored sketches.
+
+    Relies on the _lock_direction call made by _apply_rollup_deltas earlier
+    in the same transaction for the read-merge-write to be safe.
+    """
+    sketches = _build_sketches(members)
+    rows = conn.execute(
+        text("""
+            SELECT group_id, registers FROM user_sketches
+            WHERE direction_id = :direction_id AND platform = :platform
+              AND group_id = ANY(:group_ids)
+        """),
+        {"direction_id": direction_id, "platform": platform, "group_ids": list(sketches)},
+    ).fetchall()
+    for group_id, registers in rows:
+        sketches[group_id].merge(HyperLogLog(bytes(registers)))
+    _store_user_sketches(conn, direction_id, platform, sketches)
+
+
+def _store_user_sketches(
+    conn, direction_id: int, platform: str, sketches: Dict[int, HyperLogLog]
+) -> None:
+    conn.execute(
+        text("""
+            INSERT INTO user_sketches (direction_id, platform, group_id, registers, updated_at)
+            VALUES (:direction_id, :platform, :group_id, :registers, NOW())
+            ON CONFLICT (direction_id, platform, group_id)
+            DO UPDATE SET registers = EXCLUDED.registers, updated_at = EXCLUDED.updated_at
+        """),
+        [
+            {
+                "direction_id": direction_id,
+                "platform": platform,
+                "group_id": group_id,
+                "registers": bytes(sketch.registers),
+            }
+            for group_id, sketch in sketches.items()
+        ],
+    )
+
+
+# platform -> (member table, group FK column, user id column, group table)
+MEMBER_TABLES = {
+    "vk": ("vk_members", "vk_group_id", "vk_user_id", "vk_groups"),
+    "instagram": ("instagram_users", "instagram_account_id", "username", "instagram_accounts"),
+    "tiktok": ("tiktok_users", "tiktok_account_id", "username", "tiktok_accounts"),
+}
+
+# 64-bit user id used by user_id_sets; computed in SQL so a set is built and
+# serialized without member rows ever reaching Python.
+USER_ID_HASH = "('x' || substr(md5({column}), 1, 16))::bit(64)::bigint"
+
+
+def _refresh_user_id_sets(
+    conn, direction_id: int, platform: str, group_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Rebuild the sorted user-id sets of ``group_ids`` and of the direction.
+
+    Each set is the ascending, de-duplicated USER_ID_HASH values packed as
+    8-byte big-endian integers (int8send). With ``group_ids`` None every
+    group of the direction is rebuilt. The caller holds _lock_direction.
+    """
+    members, group_col, user_col, groups = MEMBER_TABLES[platform]
+    user_hash = USER_ID_HASH.format(column=f"m.{user_col}")
+    params: Dict[str, object] = {
+        "direction_id": direction_id,
+        "platform": platform,
+        "direction_set": DIRECTION_SKETCH,
+    }
+    group_filter = ""
+    if group_ids is not None:
+        group_filter = f"AND m.{group_col} = ANY(:group_ids)"
+        params["group_ids"] = list(group_ids)
+    upsert = """
+        ON CONFLICT (direction_id, platform, group_id)
+        DO UPDATE SET user_ids = EXCLUDED.user_ids, cardinality = EXCLUDED.cardinality,
+            updated_at = EXCLUDED.updated_at
+    """
+    conn.execute(
+        text(f"""
+            INSERT INTO user_id_sets (direction_id, platform, group_id, user_ids, cardinality, updated_at)
+            SELECT :direction_id, :platform, s.group_id,
+                string_agg(int8send(s.user_hash), ''::bytea ORDER BY s.user_hash), COUNT(*), NOW()
+            FROM (
+                SELECT DISTINCT m.{group_col} AS group_id, {user_hash} AS user_hash
+                FROM {members} m
+                JOIN {groups} g ON g.id = m.{group_col}
+                WHERE g.direction_id = :direction_id {group_filter}
+            ) s
+            GROUP BY s.group_id
+            {upsert}
+        """),
+        params,
+    )
+    conn.execute(
+        text(f"""
+            INSERT INTO user_id_sets (direction_id, platform, group_id, user_ids, cardinality, updated_at)
+            SELECT :direction_id, :platform, :direction_set,
+                string_agg(int8send(s.user_hash), ''::bytea ORDER BY s.user_hash), COUNT(*), NOW()
+            FROM (
+                SELECT DISTINCT {user_hash} AS user_hash
+                FROM {members} m
+                JOIN {groups} g ON g.id = m.{group_col}
+                WHERE g.direction_id = :direction_id
+            ) s
+            HAVING COUNT(*) > 0
+            {upsert}
+        """),
+        params,
+    )
+
+
+def _apply_rollup_deltas(
+    conn, direction_id: int, platform: str, rows_sql: str, dimensions: str
+) -> None:
+    """Fold a chunk's changes into analytics_rollups and daily_rollups.
+
+    ``rows_sql`` selects every staged row with delta 1 and the existing
+    version it is about to replace with delta -1, so this must run before
+    the member upsert in the same transaction. Imports into one direction
+    are serialized for the rest of the transaction so the deltas cannot
+    interleave with another import's upsert.
+    """
+    _lock_direction(conn, direction_id)
+    conn.execute(
+        text(f"""
+            INSERT INTO analytics_rollups (direction_id, platform, dimension, value, count)
+            SELECT :direction_id, :platform, d.dimension, d.value, SUM(r.delta)
+            FROM ({rows_sql}) r
+            CROSS JOIN LATERAL (VALUES {dimensions}) AS d(dimension, value)
+            WHERE d.value IS NOT NULL
+            GROUP BY d.dimension, d.value
+            HAVING SUM(r.delta) <> 0
+            ON CONFLICT (direction_id, platform, dimension, value)
+            DO UPDATE SET count = analytics_rollups.count + EXCLUDED.count
+        """),
+        {"direction_id": direction_id, "platform": platform},
+    )
+    conn.execute(
+        text("""
+            DELETE FROM analytics_rollups
+            WHERE direction_id = :direction_id AND platform = :platform AND count = 0
+        """),
+        {"direction_id": direction_id, "platform": platform},
+    )
+    conn.execute(
+        text(f"""
+            INSERT INTO daily_rollups (direction_id, platform, day, group_id, count)
+            SELECT :direction_id, :platform, r.scraped_at::date, r.group_id, SUM(r.delta)
+            FROM ({rows_sql}) r
+            WHERE r.scraped_at IS NOT NULL
+            GROUP BY r.scraped_at::date, r.group_id
+            HAVING SUM(r.delta) <> 0
+            ON CONFLICT (direction_id, platform, day, group_id)
+            DO UPDATE SET count = daily_rollups.count + EXCLUDED.count
+        """),
+        {"direction_id": direction_id, "platform": platform},
+    )
+    conn.execute(
+        text("""
+            DELETE FROM daily_rollups
+            WHERE direction_id = :direction_id AND platform = :platform AND count = 0
+        """),
+        {"direction_id": direction_id, "platform": platform},
+    )
+
 
 async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportResponse:
     imported = 0
@@ -433,6 +698,8 @@ async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportR
                 group_params,
             )
 
+        _bump_data_version(conn, direction_id)
+
         # Fetch all group IDs in one query
         rows = conn.execute(
             text("SELECT vk_group_id, id FROM vk_groups WHERE direction_id = :did"),
@@ -441,6 +708,7 @@ async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportR
         group_id_map = {r[0]: r[1] for r in rows}
 
     # ── Phase 3: Batch upsert members in chunks ──
+    touched_groups = set()
     for chunk_start in range(0, len(parsed_rows), CHUNK_SIZE):
         chunk = parsed_rows[chunk_start:chunk_start + CHUNK_SIZE]
         member_params = []
@@ -464,6 +732,7 @@ async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportR
 
         if not member_params:
             continue
+        touched_groups.update(p["vk_group_id"] for p in member_params)
 
         with engine.begin() as conn:
             # Use a temp table to determine imported vs updated counts
@@ -493,6 +762,24 @@ async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportR
                 member_params,
             )
 
+            _apply_rollup_deltas(
+                conn,
+                direction_id,
+                "vk",
+                """
+                SELECT s.vk_group_id AS group_id, s.gender, s.age, s.city, s.university,
+                    s.school, s.scraped_at, 1 AS delta
+                FROM _vk_staging s
+                UNION ALL
+                SELECT m.vk_group_id, m.gender, m.age, m.city, m.university,
+                    m.school, m.scraped_at, -1
+                FROM vk_members m
+                JOIN _vk_staging s
+                  ON s.vk_group_id = m.vk_group_id AND s.vk_user_id = m.vk_user_id
+                """,
+                VK_ROLLUP_DIMENSIONS,
+            )
+
             result = conn.execute(text("""
                 INSERT INTO vk_members (vk_group_id, vk_user_id, full_name, gender, age,
                     city, university, school, last_recently, data_timestamp, scraped_at)
@@ -517,6 +804,20 @@ async def _process_vk_records(direction_id: int, records: List[dict]) -> ImportR
                     imported += 1
                 else:
                     updated += 1
+            _merge_user_sketches(
+                conn,
+                direction_id,
+                "vk",
+                ((p["vk_group_id"], p["vk_user_id"]) for p in member_params),
+            )
+            _bump_data_version(conn, direction_id)
+
+    # ── Phase 4: Refresh overlap sets once per import ──
+    if touched_groups:
+        with engine.begin() as conn:
+            _lock_direction(conn, direction_id)
+            _refresh_user_id_sets(conn, direction_id, "vk", touched_groups)
+            _bump_data_version(conn, direction_id)
 
     return ImportResponse(
         direction_id=direction_id,
@@ -672,6 +973,8 @@ async def _process_social_records(direction_id: int, platform: str, records: Lis
                 acc_params,
             )
 
+        _bump_data_version(conn, direction_id)
+
         rows = conn.execute(
             text(f"SELECT username, id FROM {table_acc} WHERE direction_id = :did"),
             {"did": direction_id},
@@ -679,6 +982,7 @@ async def _process_social_records(direction_id: int, platform: str, records: Lis
         acc_id_map = {r[0]: r[1] for r in rows}
 
     # ── Phase 3: Batch upsert users in chunks ──
+    touched_accounts = set()
     for chunk_start in range(0, len(parsed_rows), CHUNK_SIZE):
         chunk = parsed_rows[chunk_start:chunk_start + CHUNK_SIZE]
         user_params = []
@@ -698,6 +1002,7 @@ async def _process_social_records(direction_id: int, platform: str, records: Lis
 
         if not user_params:
             continue
+        touched_accounts.update(p["acc_id"] for p in user_params)
 
         with engine.begin() as conn:
             conn.execute(text(f"""
@@ -720,6 +1025,21 @@ async def _process_social_records(direction_id: int, platform: str, records: Lis
                 user_params,
             )
 
+            _apply_rollup_deltas(
+                conn,
+                direction_id,
+                platform,
+                f"""
+                SELECT s.acc_id AS group_id, s.sex, s.city, s.scraped_at, 1 AS delta
+                FROM _social_staging s
+                UNION ALL
+                SELECT u.{fk_field}, u.sex, u.city, u.scraped_at, -1
+                FROM {table_usr} u
+                JOIN _social_staging s ON s.acc_id = u.{fk_field} AND s.username = u.username
+                """,
+                SOCIAL_ROLLUP_DIMENSIONS,
+            )
+
             result = conn.execute(text(f"""
                 INSERT INTO {table_usr} ({fk_field}, username, url, sex, city, data_timestamp, scraped_at)
                 SELECT s.acc_id, s.username, s.url, s.sex, s.city, s.data_timestamp, s.scraped_at
@@ -738,6 +1058,75 @@ async def _process_social_records(direction_id: int, platform: str, records: Lis
                     imported += 1
                 else:
                     updated += 1
+            _merge_user_sketches(
+                conn,
+                direction_id,
+                platform,
+                ((p["acc_id"], p["username"]) for p in user_params),
+            )
+            _bump_data_version(conn, direction_id)
+
+    # ── Phase 4: Refresh overlap sets once per import ──
+    if touched_accounts:
+        with engine.begin() as conn:
+            _lock_direction(conn, direction_id)
+            _refresh_user_id_sets(conn, direction_id, platform, touched_accounts)
+            _bump_data_version(conn, direction_id)
 
     return ImportResponse(direction_id=direction_id, platform=platform,
                           imported=imported, updated=updated, errors=errors[:50])
+
+
+@app.post("/scrape/sketches/rebuild")
+def rebuild_user_sketches(
+    direction_id: int, _: List[str] = Depends(require_developer)
+) -> dict:
+    """Recompute a direction's HLL sketches and user-id sets from the member tables.
+
+    Needed once for data imported before they existed; imports keep them
+    current afterwards.
+    """
+    queries = {
+        "vk": """
+            SELECT m.vk_group_id, m.vk_user_id
+            FROM vk_members m
+            JOIN vk_groups g ON g.id = m.vk_group_id
+            WHERE g.direction_id = :direction_id
+        """,
+        "instagram": """
+            SELECT u.instagram_account_id, u.username
+            FROM instagram_users u
+            JOIN instagram_accounts a ON a.id = u.instagram_account_id
+            WHERE a.direction_id = :direction_id
+        """,
+        "tiktok": """
+            SELECT u.tiktok_account_id, u.username
+            FROM tiktok_users u
+            JOIN tiktok_accounts a ON a.id = u.tiktok_account_id
+            WHERE a.direction_id = :direction_id
+        """,
+    }
+    groups: Dict[str, int] = {}
+    with engine.begin() as conn:
+        _lock_direction(conn, direction_id)
+        conn.execute(
+            text("DELETE FROM user_sketches WHERE direction_id = :direction_id"),
+            {"direction_id": direction_id},
+        )
+        conn.execute(
+            text("DELETE FROM user_id_sets WHERE direction_id = :direction_id"),
+            {"direction_id": direction_id},
+        )
+        for platform, query in queries.items():
+            result = conn.execute(
+                text(query),
+                {"direction_id": direction_id},
+                execution_options={"stream_results": True, "yield_per": CHUNK_SIZE},
+            )
+            sketches = _build_sketches((row[0], row[1]) for row in result)
+            if len(sketches) > 1:
+                _store_user_sketches(conn, direction_id, platform, sketches)
+            groups[platform] = len(sketches) - 1
+            _refresh_user_id_sets(conn, direction_id, platform)
+        _bump_data_version(conn, direction_id)
+    return {"direction_id": direction_id, "groups": groups}
@@ -75,9 +75,23 @@ def _load_vk_group_sources(direction_id: int) -> list[str]:
     return [row[0] for row in rows]
 
 
+def _bump_data_version(conn, direction_id: int) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO direction_data_versions (direction_id, version, updated_at)
+            VALUES (:direction_id, 1, NOW())
+            ON CONFLICT (direction_id)
+            DO UPDATE SET version = direction_data_versions.version + 1, updated_at = NOW()
+            """
+        ),
+        {"direction_id": direction_id},
+    )
+
+
 def _register_vk_group(direction_id: int, vk_group_id: str) -> None:
     with engine.begin() as conn:
-        conn.execute(
+        result = conn.execute(
             text(
                 """
                 INSERT INTO vk_groups (direction_id, vk_group_id)
@@ -87,6 +101,8 @@ def _register_vk_group(direction_id: int, vk_group_id: str) -> None:
             ),
             {"direction_id": direction_id, "vk_group_id": vk_group_id},
         )
+        if result.rowcount:
+            _bump_data_version(conn, direction_id)
 
 
 def _send_log(job_id: int, level: str, message: str) -> None: